@@ -2,19 +2,203 @@
 스키마 적재 스크립트 (Gemini 임베딩 사용)
 schema_guide.txt 파일을 읽어 Vector DB에 적재합니다.
 """
+import asyncio
+import hashlib
 import os
+from typing import List, Optional
 
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from aiolimiter import AsyncLimiter
 from dotenv import load_dotenv
 import chromadb
 
+from llm_service import gemini_retry
+
+
+# Gemini 임베딩 API는 요청 1회당 최대 100개 텍스트까지 허용
+GEMINI_MAX_EMBED_BATCH = 100
+# ChromaDB에는 더 큰 단위로 묶어서 적재
+CHROMA_ADD_BATCH = 500
+# 토큰(tiktoken) 기준 분할 크기
+# cl100k_base는 한글 음절을 대부분 1토큰으로 인코딩 (기본값 gpt2는 음절당 2~3토큰으로 쪼갬)
+# 600/120 토큰은 이전의 1000/200 문자 분할과 비슷한 크기 (TOP_K_RESULTS=3 기준 검색 범위 유지)
+TIKTOKEN_ENCODING = "cl100k_base"
+CHUNK_SIZE_TOKENS = 600
+CHUNK_OVERLAP_TOKENS = 120
+
+
+def _make_text_splitter() -> RecursiveCharacterTextSplitter:
+    """토큰 기준 재귀 분할기 생성"""
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=TIKTOKEN_ENCODING,
+        chunk_size=CHUNK_SIZE_TOKENS,
+        chunk_overlap=CHUNK_OVERLAP_TOKENS,
+    )
+
+
+def _make_embedder(embeddings: GoogleGenerativeAIEmbeddings, rpm: int, max_inflight: int):
+    """
+    RPM 토큰 버킷 + 동시 요청 수 제한 + 429 재시도가 적용된 배치 임베딩 함수 생성
+
+    Args:
+        embeddings: Gemini 임베딩 모델
+        rpm: 분당 허용 요청 수 (GEMINI_RPM)
+        max_inflight: 동시에 진행할 최대 요청 수 (GEMINI_MAX_INFLIGHT)
+
+    Returns:
+        텍스트 배치를 받아 임베딩 벡터 리스트를 반환하는 코루틴 함수
+    """
+    limiter = AsyncLimiter(rpm, 60)
+    semaphore = asyncio.Semaphore(max(1, max_inflight))
+
+    @gemini_retry
+    async def embed(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            async with limiter:
+                return await embeddings.aembed_documents(batch)
+
+    return embed
+
+
+async def _ingest(
+    embeddings: GoogleGenerativeAIEmbeddings,
+    collection,
+    ids: List[str],
+    texts: List[str],
+    metadatas: List[dict],
+    batch_size: int,
+    rpm: int,
+    max_inflight: int,
+) -> int:
+    """
+    임베딩(생산자)과 ChromaDB 적재(소비자)를 큐로 연결해 겹쳐서 실행
+
+    Args:
+        embeddings: Gemini 임베딩 모델
+        collection: 적재 대상 ChromaDB 컬렉션
+        ids: 문서 조각 ID 리스트 (내용 해시)
+        texts: 문서 조각 텍스트 리스트
+        metadatas: 문서 조각 메타데이터 리스트
+        batch_size: 임베딩 요청 1회당 텍스트 수
+        rpm: 분당 허용 요청 수
+        max_inflight: 동시에 진행할 최대 임베딩 요청 수
+
+    Returns:
+        적재된 문서 조각 수
+    """
+    embed = _make_embedder(embeddings, rpm, max_inflight)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+
+    async def produce(start: int) -> None:
+        batch = texts[start:start + batch_size]
+        vecs = await embed(batch)
+        await queue.put((start, batch, vecs))
+
+    async def consume() -> int:
+        added = 0
+        add_ids, vecs, docs, metas = [], [], [], []
+
+        async def flush() -> None:
+            nonlocal added, add_ids, vecs, docs, metas
+            if not docs:
+                return
+            await asyncio.to_thread(
+                collection.add, ids=add_ids, embeddings=vecs, documents=docs, metadatas=metas
+            )
+            added += len(docs)
+            print(f"  - {added}/{len(texts)}개 조각 적재 완료")
+            add_ids, vecs, docs, metas = [], [], [], []
+
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            start, batch, batch_vecs = item
+            add_ids.extend(ids[start:start + len(batch)])
+            vecs.extend(batch_vecs)
+            docs.extend(batch)
+            metas.extend(metadatas[start:start + len(batch)])
+            if len(docs) >= CHROMA_ADD_BATCH:
+                await flush()
+        await flush()
+        return added
+
+    consumer = asyncio.create_task(consume())
+    producers = asyncio.gather(*(produce(i) for i in range(0, len(texts), batch_size)))
+    try:
+        # 소비자가 먼저 실패하면(collection.add 오류 등) 큐를 비울 쪽이 없어 생산자가 put에서 멈추므로 함께 기다림
+        done, _ = await asyncio.wait({producers, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        if consumer in done:
+            # 종료 신호(None) 전에 끝난 소비자는 오류로 끝난 것이므로 오류를 전달하고 생산자는 아래에서 취소
+            consumer.result()
+            raise RuntimeError("적재 작업이 임베딩보다 먼저 종료되었습니다.")
+        producers.result()
+    except BaseException:
+        producers.cancel()
+        consumer.cancel()
+        await asyncio.gather(producers, consumer, return_exceptions=True)
+        raise
+    await queue.put(None)
+    return await consumer
+
+
+class _PGVectorCollection:
+    """
+    pgvector 저장소를 ChromaDB 컬렉션과 같은 인터페이스(get/delete/add)로 감싼 어댑터
+
+    적재 파이프라인(_ingest)과 증분 적재 로직을 저장소 종류와 무관하게 재사용합니다.
+    """
+
+    def __init__(self, connection: str, collection_name: str, embeddings, embedding_dim: int):
+        from langchain_postgres import PGVector
+
+        self._store = PGVector(
+            embeddings=embeddings,
+            collection_name=collection_name,
+            connection=connection,
+            embedding_length=embedding_dim,
+            use_jsonb=True,
+        )
+        self._ensure_hnsw_index()
+
+    def _ensure_hnsw_index(self) -> None:
+        """코사인 거리 HNSW 인덱스 생성 (이미 있으면 무시)"""
+        from sqlalchemy import text
+
+        with self._store._make_sync_session() as session:
+            session.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_langchain_pg_embedding_hnsw "
+                "ON langchain_pg_embedding USING hnsw (embedding vector_cosine_ops)"
+            ))
+            session.commit()
+
+    def get(self, include: Optional[list] = None) -> dict:
+        """컬렉션에 저장된 전체 조각 ID 조회"""
+        store = self._store
+        with store._make_sync_session() as session:
+            collection = store.get_collection(session)
+            if collection is None:
+                return {"ids": []}
+            rows = (
+                session.query(store.EmbeddingStore.id)
+                .filter(store.EmbeddingStore.collection_id == collection.uuid)
+                .all()
+            )
+        return {"ids": [row[0] for row in rows]}
+
+    def delete(self, ids: List[str]) -> None:
+        self._store.delete(ids=ids)
+
+    def add(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[dict]) -> None:
+        """미리 계산된 임베딩을 한 트랜잭션으로 일괄 적재"""
+        self._store.add_embeddings(texts=documents, embeddings=embeddings, metadatas=metadatas, ids=ids)
+
 
 def main():
     """
-    schema_guide.txt 파일의 내용을 읽어 ChromaDB 서버에 적재(Ingestion)합니다.
+    schema_guide.txt 파일의 내용을 읽어 Vector DB(ChromaDB 또는 pgvector)에 적재(Ingestion)합니다.
     (Gemini 임베딩 모델 사용 버전)
     """
     print("Vector DB 적재 스크립트 시작 (Gemini 모델 사용)...")
@@ -33,61 +217,88 @@ def main():
     CHROMA_DB_PORT = settings.CHROMA_PORT
     COLLECTION_NAME = settings.CHROMA_COLLECTION_NAME
 
-    try:
-        # 2. ChromaDB 서버에 연결
-        # chromadb 1.x에서는 HttpClient 대신 Client를 사용하고 host/port를 설정합니다
-        client = chromadb.HttpClient(
-            host=CHROMA_DB_HOST,
-            port=CHROMA_DB_PORT
-        )
-        print(f"ChromaDB 서버 ({CHROMA_DB_HOST}:{CHROMA_DB_PORT})에 연결 시도...")
-        client.heartbeat()
-        print("ChromaDB 서버 연결 성공.")
-    except Exception as e:
-        print("오류: ChromaDB 서버에 연결할 수 없습니다. (서버가 실행 중인지 확인하세요)")
-        print(f"에러 상세: {e}")
+    use_pgvector = settings.VECTOR_STORE.lower() == "pgvector"
+    if use_pgvector and not settings.POSTGRES_URL:
+        print("오류: VECTOR_STORE=pgvector 사용 시 POSTGRES_URL 설정이 필요합니다.")
         return
 
-    # 3. [업데이트 로직] 기존 컬렉션이 있다면 삭제
-    try:
-        client.delete_collection(name=COLLECTION_NAME)
-        print(f"기존 '{COLLECTION_NAME}' 컬렉션을 삭제했습니다. (업데이트를 위해)")
-    except Exception:
-        print(f"'{COLLECTION_NAME}' 컬렉션이 존재하지 않거나 삭제 중 오류 발생. 새로 생성합니다.")
+    # 2. Vector DB 서버에 연결 (pgvector는 임베딩 모델 준비 후 연결)
+    client = None
+    if not use_pgvector:
+        try:
+            # chromadb 1.x에서는 HttpClient 대신 Client를 사용하고 host/port를 설정합니다
+            client = chromadb.HttpClient(
+                host=CHROMA_DB_HOST,
+                port=CHROMA_DB_PORT
+            )
+            print(f"ChromaDB 서버 ({CHROMA_DB_HOST}:{CHROMA_DB_PORT})에 연결 시도...")
+            client.heartbeat()
+            print("ChromaDB 서버 연결 성공.")
+        except Exception as e:
+            print("오류: ChromaDB 서버에 연결할 수 없습니다. (서버가 실행 중인지 확인하세요)")
+            print(f"에러 상세: {e}")
+            return
 
-    # 4. 문서 로드 및 분할
+    # 3. 문서 로드 및 분할
     try:
         loader = TextLoader(SOURCE_DOCUMENT_PATH, encoding="utf-8")
         documents = loader.load()
 
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(documents)
+        splits = _make_text_splitter().split_documents(documents)
 
         print(f"'{SOURCE_DOCUMENT_PATH}' 로드 및 분할 완료. 총 {len(splits)}개 조각 생성.")
     except Exception as e:
         print(f"오류: 문서 로드 중 예외 발생 - {e}")
         return
 
-    # 5. Gemini 임베딩 모델 준비 (최신 모델 사용)
+    # 4. Gemini 임베딩 모델 준비 (최신 모델 사용)
     embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
 
-    # 6. LangChain Chroma 래퍼를 사용하여 Vector DB에 적재
-    print(f"'{COLLECTION_NAME}' 컬렉션에 데이터 적재 시작...")
+    # 5. [업데이트 로직] 내용 해시(SHA-256)를 ID로 사용하여 바뀐 조각만 다시 임베딩
     try:
-        Chroma.from_documents(
-            client=client,
-            documents=splits,
-            embedding=embeddings,
-            collection_name=COLLECTION_NAME,
-        )
+        if use_pgvector:
+            print("pgvector 저장소에 연결 시도...")
+            collection = _PGVectorCollection(
+                settings.POSTGRES_URL, COLLECTION_NAME, embeddings, settings.PGVECTOR_EMBEDDING_DIM
+            )
+        else:
+            collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+        chunks = {}
+        for d in splits:
+            chunk_id = hashlib.sha256(d.page_content.encode("utf-8")).hexdigest()
+            chunks.setdefault(chunk_id, d)
+
+        # 원본에서 사라진 조각 삭제
+        stored_ids = collection.get(include=[])["ids"]
+        stale_ids = [i for i in stored_ids if i not in chunks]
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+            print(f"원본에서 제거된 {len(stale_ids)}개 조각을 삭제했습니다.")
+
+        existing = set(stored_ids)
+        new_ids = [i for i in chunks if i not in existing]
+        print(f"변경 없는 조각 {len(chunks) - len(new_ids)}개는 건너뜁니다. 새로 적재할 조각: {len(new_ids)}개")
+    except Exception as e:
+        print(f"오류: 기존 컬렉션 조회 중 예외 발생 - {e}")
+        return
+
+    # 6. 100개 단위 배치를 병렬로 임베딩 후 Vector DB에 적재
+    batch_size = min(settings.EMBEDDING_BATCH_SIZE, GEMINI_MAX_EMBED_BATCH)
+    print(f"'{COLLECTION_NAME}' 컬렉션에 데이터 적재 시작... (배치 크기: {batch_size}, RPM: {settings.GEMINI_RPM})")
+    try:
+        texts = [chunks[i].page_content for i in new_ids]
+        metadatas = [chunks[i].metadata for i in new_ids]
+        if texts:
+            asyncio.run(_ingest(embeddings, collection, new_ids, texts, metadatas, batch_size, settings.GEMINI_RPM, settings.GEMINI_MAX_INFLIGHT))
+
         print("=" * 50)
         print("성공: Vector DB에 스키마 정보 적재가 완료되었습니다. (Gemini)")
-        print(f"총 {len(splits)}개의 문서 조각이 '{COLLECTION_NAME}'에 저장되었습니다.")
+        print(f"총 {len(chunks)}개의 문서 조각이 '{COLLECTION_NAME}'에 저장되어 있습니다. (신규 {len(texts)}개)")
         print("=" * 50)
     except Exception as e:
         print(f"오류: Vector DB 데이터 적재 중 예외 발생 - {e}")
 
-
 if __name__ == "__main__":
     main()
 
@@ -2,52 +2,33 @@
 LLM 서비스 모듈
 Google Gemini를 사용하여 LLM 호출을 처리합니다.
 """
-from typing import Optional, Dict, Any, Tuple
-import json
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Iterator, List, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import asyncio
+import logging
+import orjson
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+import time
+from google.api_core.exceptions import ResourceExhausted
 from langchain_core.messages import HumanMessage
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from config import settings
 
+logger = logging.getLogger(__name__)
 
-class LLMService:
-    """LLM 서비스 클래스"""
-    
-    def __init__(self):
-        """LLM 서비스 초기화"""
-        self.provider = settings.LLM_PROVIDER.lower()
-        
-        if self.provider == "gemini":
-            if not settings.GOOGLE_API_KEY:
-                raise ValueError("GOOGLE_API_KEY가 설정되지 않았습니다.")
-            self.model = ChatGoogleGenerativeAI(
-                model=settings.GEMINI_MODEL,
-                google_api_key=settings.GOOGLE_API_KEY,
-                temperature=0.1
-            )
-        else:
-            raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
-    
-    def generate_sql(self, query: str, schema_hints: str) -> str:
-        """
-        SQL 생성
-        
-        Args:
-            query: 사용자 질문
-            schema_hints: Vector DB에서 검색된 스키마 힌트
-            
-        Returns:
-            생성된 SQL 쿼리
-        """
-        prompt = f"""당신은 MS-SQL (T-SQL) 전문가입니다. 반드시 아래 제공된 스키마 정보만 사용하여 SQL 쿼리를 생성해주세요.
 
-=== 데이터베이스 스키마 정보 (반드시 이 정보만 사용) ===
-{schema_hints}
-===============================================
-
-사용자 질문: {query}
+# 마크다운 강조(**bold**) → HTML 변환용 정규식
+# 패턴: 숫자. **제품명**: 금액원 (금액은 숫자와 쉼표, 원 포함)
+_LIST_ITEM_RE = re.compile(r"(\d+\.\s+)\*\*(.+?)\*\*:\s+([\d,]+원)", re.MULTILINE)
+# 패턴: *   **월:** 값
+_MONTH_ITEM_RE = re.compile(r"\*\s+\*\*(\d+월):\*\*\s+([\d,\.]+)", re.MULTILINE)
+# 패턴: **bold**
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*", re.DOTALL)
 
-중요 규칙 (반드시 준수):
+# SQL 생성 규칙 (generate_sql / classify_and_act 공용)
+_SQL_RULES = """중요 규칙 (반드시 준수):
 1. **테이블 선택 규칙 (매우 중요):**
    - 질문에 "발주", "발주서", "주문", "주문서", "Pkfl" 등의 키워드가 포함되어 있으면 → **heechang.heechang.Pkfl** 테이블을 사용하세요.
    - 질문에 "매출", "판매", "실적", "목표", "sffl" 등의 키워드가 포함되어 있으면 → **sffl** 테이블을 사용하세요.
@@ -119,44 +100,42 @@ class LLMService:
    - COUNT(DISTINCT 컬럼명)은 사용자가 명시적으로 요청한 경우에만 사용하세요.
    - 단순히 "건수", "개수", "몇 개"를 물어보는 경우에는 COUNT(*)를 사용하세요.
 11. SQL 쿼리만 반환하세요. 설명, 주석, 마크다운 코드 블록은 포함하지 마세요.
-12. 테이블명과 컬럼명은 대소문자를 구분하여 정확히 사용하세요 (예: Pk_date, Pk_pdat, sf_date, sf_yona 등).
+12. 테이블명과 컬럼명은 대소문자를 구분하여 정확히 사용하세요 (예: Pk_date, Pk_pdat, sf_date, sf_yona 등)."""
+
+# 질문 분류 판단 기준 (classify_and_act 프롬프트에 포함)
+_CLASSIFY_CRITERIA = """판단 기준:
+1. **SQL**: 데이터 조회 질문 (예: "8월 발주 건수는?", "거래처 목록 보여줘", "발주 현황 분석해줘", "월별 발주 추이 비교", "거래처별 발주 패턴 분석")
+   - 단순 조회 질문
+   - 분석, 비교, 트렌드, 요약 등의 질문이지만 **문서/보고서/차트 생성 요청이 없는 경우**
+   - "분석해줘", "비교해줘", "현황 알려줘", "추이 보여줘" 등 → 일반 텍스트로 답변
+   
+2. **REPORT**: **명시적으로 문서/보고서/차트 생성 요청**이 있는 질문
+   - "보고서를 만들어줘", "차트를 만들어줘", "문서로 만들어줘", "HTML로 만들어줘"
+   - "보고서 작성해줘", "차트 작성해줘", "문서 작성해줘"
+   - "보고서로 정리해줘", "차트로 보여줘", "문서 형태로 만들어줘"
+   - **중요**: 단순히 "분석해줘", "비교해줘", "현황 알려줘"만 있으면 SQL 타입으로 분류 (일반 텍스트 답변)
+   
+3. **GENERAL_CHAT**: 데이터베이스와 무관한 일반 질문 (예: "파이썬이 뭐야?", "날씨 알려줘")
+   - 스키마, 발주, 입고, 품목 등과 무관한 질문
+   - 이 경우 chat_answer에 직접 답변을 생성하세요"""
+
+# ===== 프롬프트 템플릿 (모듈 로드 시 한 번만 생성, 호출 시 str.format으로 치환) =====
+
+# SQL 생성 프롬프트
+_SQL_PROMPT_TMPL = f"""당신은 MS-SQL (T-SQL) 전문가입니다. 반드시 아래 제공된 스키마 정보만 사용하여 SQL 쿼리를 생성해주세요.
+
+=== 데이터베이스 스키마 정보 (반드시 이 정보만 사용) ===
+{{schema_hints}}
+===============================================
+
+사용자 질문: {{query}}
+
+{_SQL_RULES}
 
 SQL 쿼리:"""
 
-        if self.provider == "gemini":
-            messages = [HumanMessage(content=prompt)]
-            response = self.model.invoke(messages)
-            sql = response.content.strip() if hasattr(response, 'content') else str(response)
-        else:
-            raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
-        
-        # SQL만 추출 (마크다운 코드 블록 제거)
-        if sql.startswith("```"):
-            lines = sql.split("\n")
-            sql = "\n".join(lines[1:-1]) if len(lines) > 2 else sql
-        if sql.startswith("```sql"):
-            lines = sql.split("\n")
-            sql = "\n".join(lines[1:-1]) if len(lines) > 2 else sql
-        
-        return sql
-    
-    def summarize(self, query: str, data: str) -> str:
-        """
-        데이터 요약
-        
-        Args:
-            query: 원본 질문
-            data: DB 조회 결과 JSON 문자열
-            
-        Returns:
-            요약된 응답 (그래프가 필요한 경우 HTML 포함)
-        """
-        # 그래프가 필요한지 확인 (추이, 그래프, 차트 등의 키워드)
-        needs_graph = any(keyword in query.lower() for keyword in ["추이", "그래프", "차트", "chart", "trend"])
-        
-        if needs_graph:
-            # 그래프 포함 HTML 응답 생성
-            prompt = f"""다음 질문과 데이터를 바탕으로 HTML 형식의 답변을 작성해주세요.
+# 데이터 요약 프롬프트 (그래프 포함 HTML 응답)
+_SUMMARIZE_GRAPH_TMPL = """다음 질문과 데이터를 바탕으로 HTML 형식의 답변을 작성해주세요.
 
 질문: {query}
 
@@ -182,9 +161,9 @@ SQL 쿼리:"""
 - 예시: 막대 그래프는 <div>의 width나 height로 표현, 추이 그래프는 점과 선으로 표현
 
 답변:"""
-        else:
-            # 일반 텍스트 응답
-            prompt = f"""다음 질문과 데이터를 바탕으로 자연스럽고 명확한 답변을 작성해주세요.
+
+# 데이터 요약 프롬프트 (일반 텍스트 응답)
+_SUMMARIZE_TEXT_TMPL = """다음 질문과 데이터를 바탕으로 자연스럽고 명확한 답변을 작성해주세요.
 
 질문: {query}
 
@@ -199,21 +178,542 @@ SQL 쿼리:"""
 
 답변:"""
 
+# 스키마 관련 질문 판단 프롬프트
+_SCHEMA_CHECK_TMPL = """다음 질문이 데이터베이스 스키마(발주, 입고, 품목, 거래처 등)와 관련된 질문인지 판단해주세요.
+
+질문: {query}
+
+판단 기준:
+- 데이터베이스의 테이블, 컬럼, 데이터를 조회하는 질문이면 "YES"
+- 발주, 입고, 품목, 거래처, 건수, 조회, 데이터 등과 관련된 질문이면 "YES"
+- 일반적인 지식 질문(프로그래밍, 날씨, 역사 등)이면 "NO"
+- 단순히 개념을 묻는 질문이면 "NO"
+
+답변은 반드시 "YES" 또는 "NO"만 반환하세요."""
+
+# 일반 질문 답변 프롬프트
+_CHAT_TMPL = """다음 질문에 대해 자연스럽고 명확한 답변을 작성해주세요.
+
+질문: {question}
+
+요구사항:
+1. 질문에 정확하고 유용한 답변을 제공하세요.
+2. 자연스러운 한국어로 답변하세요.
+3. 불필요한 설명은 생략하고 핵심 내용만 전달하세요.
+4. 모르는 내용이면 솔직하게 모른다고 답변하세요.
+
+답변:"""
+
+# 질문 분류 + SQL 생성 통합 프롬프트
+_CLASSIFY_AND_ACT_TMPL = f"""다음 사용자 질문을 분석하여 필요한 행동 유형을 결정하고, SQL 질문이면 SQL 쿼리까지 생성하여 아래 JSON 형식으로만 응답하세요.
+
+사용자 질문: {{query}}
+
+{_CLASSIFY_CRITERIA}
+
+=== 데이터베이스 스키마 정보 (SQL 생성 시 반드시 이 정보만 사용) ===
+{{schema_hints}}
+===============================================
+
+SQL 생성 시 {_SQL_RULES}
+
+중요 규칙:
+- 반드시 아래 JSON 형식으로만 응답하세요.
+- action_type이 GENERAL_CHAT인 경우에만 chat_answer를 작성하세요.
+- action_type이 SQL 또는 REPORT인 경우 query에 원본 질문을 그대로 반환하세요.
+- action_type이 SQL인 경우에만 sql에 MS-SQL 쿼리를 작성하세요.
+- JSON 외의 다른 텍스트는 포함하지 마세요.
+- **REPORT는 반드시 "보고서/차트/문서 만들기" 같은 명시적 요청이 있을 때만 사용하세요.**
+
+응답 형식 (JSON):
+{{{{
+    "action_type": "SQL" | "REPORT" | "GENERAL_CHAT",
+    "chat_answer": "GENERAL_CHAT인 경우에만 답변",
+    "query": "SQL 또는 REPORT인 경우 원본 질문",
+    "sql": "SQL인 경우에만 MS-SQL 쿼리"
+}}}}"""
+
+# 보고서 공통 지침
+# 보고서 HTML 작성 규칙 (JSON/스트리밍 보고서 공통)
+_REPORT_HTML_RULES = """HTML 규칙:
+- 완전한 HTML 문서 구조를 포함하세요 (<html>, <head>, <body>).
+- 기본 스타일을 위해 inline CSS를 head에 포함하세요 (폰트, 색상, 카드 스타일 등).
+- 최소 1개의 데이터 요약 표를 포함하세요.
+- 가능하면 간단한 막대/bar 스타일 차트를 CSS로 표현하세요 (예: div 막대).
+- 외부 라이브러리는 사용하지 마세요. 순수 HTML/CSS만 사용하세요.
+- 데이터가 없으면 합리적인 가상 수치를 사용하지만, 가상의 값임을 명시하세요.
+"""
+
+_REPORT_BASE_TMPL = f"""
+응답은 반드시 아래 JSON 형식을 따르세요:
+{{{{
+  "summary": "<자연어 요약 (마크다운 허용)>",
+  "html_report": "<!DOCTYPE html>로 시작하는 완전한 HTML 문서 문자열>",
+  "notes": "<선택 사항>"
+}}}}
+
+{_REPORT_HTML_RULES}"""
+
+# 스트리밍 보고서용: JSON 대신 HTML 문서만 출력 (생성되는 대로 전송 가능)
+_REPORT_STREAM_BASE_TMPL = f"""
+<!DOCTYPE html>로 시작하는 완전한 HTML 문서만 출력하세요. 코드 블록(```)이나 HTML 밖의 설명은 쓰지 마세요.
+
+{_REPORT_HTML_RULES}"""
+
+# 데이터 기반 보고서 프롬프트
+_REPORT_DATA_TMPL = f"""다음 질문과 데이터를 바탕으로 HTML 보고서를 작성해주세요.
+
+질문: {{query}}
+
+데이터:
+{{data}}
+
+{_REPORT_BASE_TMPL}
+"""
+
+# 텍스트 기반 보고서 프롬프트
+_REPORT_TEXT_TMPL = f"""다음 질문에 대한 HTML 보고서를 작성해주세요.
+
+질문: {{query}}
+
+{_REPORT_BASE_TMPL}
+"""
+
+# 데이터 기반 스트리밍 보고서 프롬프트
+_REPORT_STREAM_DATA_TMPL = f"""다음 질문과 데이터를 바탕으로 HTML 보고서를 작성해주세요.
+
+질문: {{query}}
+
+데이터:
+{{data}}
+
+{_REPORT_STREAM_BASE_TMPL}
+"""
+
+# 텍스트 기반 스트리밍 보고서 프롬프트
+_REPORT_STREAM_TEXT_TMPL = f"""다음 질문에 대한 HTML 보고서를 작성해주세요.
+
+질문: {{query}}
+
+{_REPORT_STREAM_BASE_TMPL}
+"""
+
+# 질문 분류 응답 JSON Schema (Gemini response_schema로 전달, type은 Gemini Schema의 Type 열거형 이름)
+_CLASSIFY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "action_type": {
+            "type": "STRING",
+            "format": "enum",
+            "enum": ["SQL", "REPORT", "GENERAL_CHAT"],
+            "description": "질문의 유형. SQL: 단순 데이터 조회 질문, REPORT: 분석/보고서가 필요한 복합 질문, GENERAL_CHAT: 일반 대화 질문"
+        },
+        "chat_answer": {
+            "type": "STRING",
+            "description": "action_type이 GENERAL_CHAT일 경우 Gemini가 생성한 답변"
+        },
+        "query": {
+            "type": "STRING",
+            "description": "action_type이 SQL 또는 REPORT일 경우 원본 질문 또는 정제된 질문"
+        }
+    },
+    "required": ["action_type"]
+}
+
+# 보고서 응답 JSON Schema (Gemini response_schema로 전달)
+_REPORT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {
+            "type": "STRING",
+            "description": "자연어 요약 (마크다운 허용)"
+        },
+        "html_report": {
+            "type": "STRING",
+            "description": "<!DOCTYPE html>로 시작하는 완전한 HTML 문서 문자열"
+        },
+        "notes": {
+            "type": "STRING",
+            "description": "선택 사항"
+        }
+    },
+    "required": ["summary", "html_report"]
+}
+
+# 질문 분류 + SQL 생성 통합 응답 JSON Schema
+_CLASSIFY_AND_ACT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        **_CLASSIFY_SCHEMA["properties"],
+        "sql": {
+            "type": "STRING",
+            "description": "action_type이 SQL일 경우 생성된 MS-SQL (T-SQL) 쿼리"
+        }
+    },
+    "required": ["action_type"]
+}
+
+# 그래프가 필요한 질문 판단용 키워드 (추이, 그래프, 차트 등)
+_GRAPH_RE = re.compile(r"추이|그래프|차트|chart|trend", re.IGNORECASE)
+
+
+def _repl_list_item(match: re.Match) -> str:
+    """리스트 항목: 1. **제품명**: 금액원 -> 1. <strong>제품명</strong>: <strong>금액원</strong>"""
+    num = match.group(1)  # 숫자.
+    product = match.group(2)  # 제품명
+    amount = match.group(3)  # 금액
+    return f"{num}<strong>{product}</strong>: <strong>{amount}</strong>"
+
+
+def _repl_month_item(match: re.Match) -> str:
+    """월별 항목: *   **1월:** 32,400.0 -> *   <strong>1월:</strong> 32,400.0"""
+    month = match.group(1)  # 월
+    value = match.group(2)  # 값
+    return f"*   <strong>{month}:</strong> {value}"
+
+
+def _repl_bold(match: re.Match) -> str:
+    """일반 강조: **bold** -> <strong>bold</strong>"""
+    return f"<strong>{match.group(1)}</strong>"
+
+
+_backoff = wait_exponential_jitter(initial=1, max=60)
+
+
+def is_rate_limited(exc: Optional[BaseException]) -> bool:
+    """
+    429(ResourceExhausted) 여부 확인 (LangChain 래핑 예외의 원인까지 추적)
+    
+    메시지에 "429"가 들어 있는 것만으로는 판단하지 않고, 예외 타입 또는 HTTP 상태 코드로 확인합니다.
+    """
+    for _ in range(5):
+        if exc is None:
+            return False
+        if isinstance(exc, ResourceExhausted):
+            return True
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+        if status == 429:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _retry_after_seconds(exc: Optional[BaseException]) -> Optional[float]:
+    """서버가 내려준 retry-after 헤더 값(초)을 찾아 반환"""
+    for _ in range(5):
+        if exc is None:
+            return None
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers and headers.get("retry-after"):
+            try:
+                return float(headers["retry-after"])
+            except ValueError:
+                return None
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def _wait_gemini(retry_state) -> float:
+    """retry-after 헤더가 있으면 따르고, 없으면 지수 백오프(jitter) 사용"""
+    delay = _retry_after_seconds(retry_state.outcome.exception())
+    return delay if delay is not None else _backoff(retry_state)
+
+
+# Gemini 429 재시도 데코레이터 (동기/비동기 함수 모두 사용 가능, rag_service.py/ingest_schema.py 공용)
+# SDK가 재시도하지 않는 임베딩 호출에만 사용합니다. 채팅 호출(invoke/stream)은 langchain-google-genai가
+# 이미 _chat_with_retry로 최대 10회 재시도하므로 다시 감싸면 요청당 시도 횟수가 곱으로 늘어납니다.
+gemini_retry = retry(
+    retry=retry_if_exception(is_rate_limited),
+    wait=_wait_gemini,
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+
+
+class RateLimiter:
+    """
+    스레드용 분당 요청 수 제한 (aiolimiter.AsyncLimiter와 같은 leaky bucket 방식)
+    
+    time_period 동안 최대 max_rate번까지 통과시키고, 초과하면 자리가 날 때까지 호출 스레드를 재웁니다.
+    """
+    
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self._rate_per_sec = max_rate / time_period
+        self._level = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _try_acquire(self) -> float:
+        """자리가 있으면 확보하고 0을, 없으면 기다려야 할 시간(초)을 반환"""
+        with self._lock:
+            now = time.monotonic()
+            self._level = max(0.0, self._level - (now - self._last) * self._rate_per_sec)
+            self._last = now
+            if self._level + 1 <= self.max_rate:
+                self._level += 1
+                return 0.0
+            return (self._level + 1 - self.max_rate) / self._rate_per_sec
+    
+    def acquire(self) -> None:
+        """요청 1회분의 자리를 확보 (없으면 스레드를 재우며 대기)"""
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self) -> None:
+        """acquire의 비동기 버전 (대기 중 이벤트 루프를 막지 않음)"""
+        while (wait := self._try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+
+# 캐시 키 정규화용: 문장 끝 부호(?!.)만 지우고 연속 공백을 한 칸으로 합침
+# 비교 연산자(<, >, =)나 소수점은 질문의 뜻을 바꾸므로 키에 그대로 남김
+_WS_RE = re.compile(r"\s+")
+_SENTENCE_END_RE = re.compile(r"[?!.]+(?=\s|$)")
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키용 질문 정규화 (소문자 변환, 문장 끝 ?!. 제거, 연속 공백을 한 칸으로)"""
+    return _WS_RE.sub(" ", _SENTENCE_END_RE.sub(" ", query.lower())).strip()
+
+
+class _QueryCache:
+    """
+    정규화된 질문 키 -> 결과 LRU 캐시 (스레드 안전, 적중/실패 횟수 집계)
+    
+    키만 정규화하고 LLM 호출에는 원본 질문을 넘기기 위해 lru_cache 대신 사용합니다.
+    계산 중 예외가 나면 캐시하지 않습니다.
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_or_call(self, query: str, func: Callable[[str], Any]) -> Any:
+        """normalize_query(query)로 조회하고, 없으면 func(query)를 호출해 저장"""
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = func(query)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+    
+    def stats(self) -> Dict[str, Any]:
+        """적중/실패 횟수, 항목 수, 적중률"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "hit_rate": self.hits / total if total else 0.0
+            }
+    
+    def clear(self) -> None:
+        """캐시와 통계 초기화"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+@lru_cache(maxsize=None)
+def _get_chat_model(model_name: str, api_key: str, transport: str):
+    """
+    Gemini 채팅 클라이언트를 프로세스 단위로 공유
+
+    같은 설정의 LLMService 인스턴스들이 하나의 클라이언트(연결/채널)를 재사용하므로
+    호출마다 새 연결을 맺지 않습니다. Google SDK는 무거우므로 최초 호출 시점에 import 합니다.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        google_api_key=api_key,
+        temperature=0.1,
+        transport=transport
+    )
+
+
+class LLMService:
+    """LLM 서비스 클래스"""
+    
+    __slots__ = (
+        "provider", "_model", "_gemini_model_name", "_api_key",
+        "_schema_check_cache",
+    )
+    
+    # 프로세스 전체의 Gemini 호출 제한: 분당 요청 수(GEMINI_RPM)와 동시 진행 수(GEMINI_MAX_INFLIGHT)는 별개
+    _rate_limiter = RateLimiter(settings.GEMINI_RPM, 60)
+    _inflight = threading.BoundedSemaphore(max(1, settings.GEMINI_MAX_INFLIGHT))
+    _inflight_timeout = settings.GEMINI_INFLIGHT_TIMEOUT
+    
+    def __init__(self):
+        """LLM 서비스 초기화"""
+        # 설정값은 초기화 시 한 번만 읽어 인스턴스에 보관
+        self.provider = settings.LLM_PROVIDER.lower()
+        self._gemini_model_name = settings.GEMINI_MODEL
+        self._api_key = settings.GOOGLE_API_KEY
+        
+        if self.provider == "gemini":
+            if not self._api_key:
+                raise ValueError("GOOGLE_API_KEY가 설정되지 않았습니다.")
+        else:
+            raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
+        
+        # Gemini 클라이언트는 첫 호출 시 생성 (model 프로퍼티)
+        self._model = None
+        
+        # 반복 질문용 스키마 질문 판단 캐시 (정규화된 질문 기준, temperature가 낮아 결과가 안정적)
+        # (/classify-query 분류 결과는 main.py의 classify_cache가 스키마 힌트 검색 전에 확인)
+        self._schema_check_cache = _QueryCache(maxsize=4096)
+    
+    @property
+    def model(self):
+        """Gemini 채팅 모델 (최초 접근 시 생성)"""
+        if self._model is None:
+            self._model = _get_chat_model(
+                self._gemini_model_name, self._api_key, settings.GEMINI_TRANSPORT
+            )
+        return self._model
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """스키마 질문 판단 캐시의 적중/실패 횟수와 적중률"""
+        return {
+            "schema_check": self._schema_check_cache.stats()
+        }
+    
+    def clear_caches(self) -> None:
+        """스키마 질문 판단 캐시 비우기 (프롬프트/모델 변경 후 사용)"""
+        self._schema_check_cache.clear()
+    
+    def generate_sql(self, query: str, schema_hints: str) -> str:
+        """
+        SQL 생성
+        
+        Args:
+            query: 사용자 질문
+            schema_hints: Vector DB에서 검색된 스키마 힌트
+            
+        Returns:
+            생성된 SQL 쿼리
+        """
+        prompt = _SQL_PROMPT_TMPL.format(schema_hints=schema_hints, query=query)
+
         if self.provider == "gemini":
             messages = [HumanMessage(content=prompt)]
-            response = self.model.invoke(messages)
+            response = self._invoke(messages)
+            sql = response.content.strip() if hasattr(response, 'content') else str(response)
+        else:
+            raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
+        
+        # SQL만 추출 (마크다운 코드 블록 제거)
+        sql = self._strip_code_fence(sql)
+        
+        return sql
+    
+    def summarize(self, query: str, data: str) -> str:
+        """
+        데이터 요약
+        
+        Args:
+            query: 원본 질문
+            data: DB 조회 결과 JSON 문자열
+            
+        Returns:
+            요약된 응답 (그래프가 필요한 경우 HTML 포함)
+        """
+        prompt = self._summarize_prompt(query, data)
+
+        if self.provider == "gemini":
+            messages = [HumanMessage(content=prompt)]
+            response = self._invoke(messages)
             summary = response.content.strip() if hasattr(response, 'content') else str(response)
             
             # 마크다운을 HTML로 변환
-            if needs_graph:
-                summary = self._normalize_text_with_html(summary)
-            else:
-                summary = self._normalize_text_with_html(summary)
+            summary = self._normalize(summary, treat_as_html=False)
         else:
             raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
         
         return summary
     
+    def summarize_stream(self, query: str, data: str) -> Iterator[str]:
+        """
+        데이터 요약 (스트리밍)
+        
+        Gemini 스트리밍 응답을 받아 완성된 줄 단위로 마크다운을 HTML로 변환하여 반환합니다.
+        
+        Args:
+            query: 원본 질문
+            data: DB 조회 결과 JSON 문자열
+            
+        Yields:
+            변환된 응답 조각
+        """
+        if self.provider != "gemini":
+            raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
+        
+        messages = [HumanMessage(content=self._summarize_prompt(query, data))]
+        # summarize()와 같은 기준: 응답에 <html/<div가 있으면 줄바꿈을 <br>로 바꾸지 않음
+        # 그래프 프롬프트는 HTML 답변(<style> 등으로 시작 가능)을 요청하므로 판단이 날 때까지 줄을 보류
+        hold = bool(_GRAPH_RE.search(query))
+        is_html = False
+        emitted = False
+        held: List[str] = []  # 보내지 않은 줄 (보류 중이거나, 뒤에 내용이 올지 모르는 빈 줄)
+        
+        for line in self._stream_lines(messages):
+            if not is_html:
+                lowered = line.lower()
+                is_html = "<html" in lowered or "<div" in lowered
+            held.append(self._normalize(line, treat_as_html=False))
+            if not line.strip() or (hold and not is_html):
+                continue
+            yield self._join_lines(held, is_html, emitted)
+            held = []
+            emitted = True
+        
+        # summarize()의 strip()처럼 끝의 빈 줄은 버림
+        while held and not held[-1].strip():
+            held.pop()
+        if held:
+            held[-1] = held[-1].rstrip()
+            yield self._join_lines(held, is_html, emitted)
+    
+    @staticmethod
+    def _join_lines(lines: List[str], is_html: bool, emitted: bool) -> str:
+        """요약 스트리밍용: 줄들을 HTML이면 줄바꿈, 아니면 <br>로 연결 (첫 조각은 앞쪽 빈 줄/공백 제거)"""
+        sep = "\n" if is_html else "<br>"
+        if not emitted:
+            while not lines[0].strip():
+                lines = lines[1:]
+            return sep.join([lines[0].lstrip(), *lines[1:]])
+        return sep + sep.join(lines)
+    
+    def _summarize_prompt(self, query: str, data: str) -> str:
+        """요약 프롬프트 생성 (그래프 키워드가 있으면 HTML 그래프 포함 프롬프트)"""
+        # 그래프가 필요한지 확인 (추이, 그래프, 차트 등의 키워드)
+        needs_graph = bool(_GRAPH_RE.search(query))
+        
+        if needs_graph:
+            # 그래프 포함 HTML 응답 생성
+            prompt = _SUMMARIZE_GRAPH_TMPL.format(query=query, data=data)
+        else:
+            # 일반 텍스트 응답
+            prompt = _SUMMARIZE_TEXT_TMPL.format(query=query, data=data)
+        
+        return prompt
+    
     def is_schema_related_query(self, query: str) -> bool:
         """
         질문이 스키마 관련 질문인지 판단
@@ -224,21 +724,15 @@ SQL 쿼리:"""
         Returns:
             True: 스키마 관련 질문, False: 일반 질문
         """
-        prompt = f"""다음 질문이 데이터베이스 스키마(발주, 입고, 품목, 거래처 등)와 관련된 질문인지 판단해주세요.
-
-질문: {query}
-
-판단 기준:
-- 데이터베이스의 테이블, 컬럼, 데이터를 조회하는 질문이면 "YES"
-- 발주, 입고, 품목, 거래처, 건수, 조회, 데이터 등과 관련된 질문이면 "YES"
-- 일반적인 지식 질문(프로그래밍, 날씨, 역사 등)이면 "NO"
-- 단순히 개념을 묻는 질문이면 "NO"
-
-답변은 반드시 "YES" 또는 "NO"만 반환하세요."""
+        return self._schema_check_cache.get_or_call(query, self._is_schema_related_uncached)
+    
+    def _is_schema_related_uncached(self, query: str) -> bool:
+        """스키마 관련 질문 판단 LLM 호출 (원본 질문 사용, 결과는 정규화된 질문 기준으로 캐시됨)"""
+        prompt = _SCHEMA_CHECK_TMPL.format(query=query)
 
         if self.provider == "gemini":
             messages = [HumanMessage(content=prompt)]
-            response = self.model.invoke(messages)
+            response = self._invoke(messages)
             answer = response.content.strip() if hasattr(response, 'content') else str(response)
             
             # YES/NO 판단
@@ -265,132 +759,78 @@ SQL 쿼리:"""
         Returns:
             생성된 답변
         """
-        prompt = f"""다음 질문에 대해 자연스럽고 명확한 답변을 작성해주세요.
-
-질문: {question}
-
-요구사항:
-1. 질문에 정확하고 유용한 답변을 제공하세요.
-2. 자연스러운 한국어로 답변하세요.
-3. 불필요한 설명은 생략하고 핵심 내용만 전달하세요.
-4. 모르는 내용이면 솔직하게 모른다고 답변하세요.
-
-답변:"""
+        prompt = _CHAT_TMPL.format(question=question)
 
         if self.provider == "gemini":
             messages = [HumanMessage(content=prompt)]
-            response = self.model.invoke(messages)
+            response = self._invoke(messages)
             answer = response.content.strip() if hasattr(response, 'content') else str(response)
         else:
             raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
         
         return answer
     
-    def classify_query(self, query: str) -> Dict[str, Any]:
+    def classify_and_act(self, query: str, schema_hints: str) -> Dict[str, Any]:
         """
-        질문을 분류하여 필요한 행동 유형을 결정
+        질문 분류와 SQL 생성을 한 번의 Gemini 호출로 처리
+        
+        질문 분류와 generate_sql을 하나의 구조화된 호출로 합쳐
+        SQL 질문에서 발생하던 왕복 호출을 줄입니다.
         
         Args:
             query: 사용자 질문
+            schema_hints: Vector DB에서 검색된 스키마 힌트
             
         Returns:
             분류 결과 딕셔너리:
                 - action_type: "SQL", "REPORT", "GENERAL_CHAT" 중 하나
                 - chat_answer: action_type이 GENERAL_CHAT일 경우 답변
                 - query: action_type이 SQL 또는 REPORT일 경우 원본/정제된 질문
+                - sql: action_type이 SQL일 경우 생성된 SQL
+                - parse_failed: 응답을 파싱하지 못해 기본 응답(GENERAL_CHAT)을 반환한 경우 True (캐시하지 말 것)
         """
-        # JSON Schema 정의
-        json_schema = {
-            "type": "object",
-            "properties": {
-                "action_type": {
-                    "type": "string",
-                    "enum": ["SQL", "REPORT", "GENERAL_CHAT"],
-                    "description": "질문의 유형. SQL: 단순 데이터 조회 질문, REPORT: 분석/보고서가 필요한 복합 질문, GENERAL_CHAT: 일반 대화 질문"
-                },
-                "chat_answer": {
-                    "type": "string",
-                    "description": "action_type이 GENERAL_CHAT일 경우 Gemini가 생성한 답변"
-                },
-                "query": {
-                    "type": "string",
-                    "description": "action_type이 SQL 또는 REPORT일 경우 원본 질문 또는 정제된 질문"
-                }
-            },
-            "required": ["action_type"]
-        }
-        
-        prompt = f"""다음 사용자 질문을 분석하여 필요한 행동 유형을 결정하고, 아래 JSON 형식으로만 응답하세요.
-
-사용자 질문: {query}
-
-판단 기준:
-1. **SQL**: 데이터 조회 질문 (예: "8월 발주 건수는?", "거래처 목록 보여줘", "발주 현황 분석해줘", "월별 발주 추이 비교", "거래처별 발주 패턴 분석")
-   - 단순 조회 질문
-   - 분석, 비교, 트렌드, 요약 등의 질문이지만 **문서/보고서/차트 생성 요청이 없는 경우**
-   - "분석해줘", "비교해줘", "현황 알려줘", "추이 보여줘" 등 → 일반 텍스트로 답변
-   
-2. **REPORT**: **명시적으로 문서/보고서/차트 생성 요청**이 있는 질문
-   - "보고서를 만들어줘", "차트를 만들어줘", "문서로 만들어줘", "HTML로 만들어줘"
-   - "보고서 작성해줘", "차트 작성해줘", "문서 작성해줘"
-   - "보고서로 정리해줘", "차트로 보여줘", "문서 형태로 만들어줘"
-   - **중요**: 단순히 "분석해줘", "비교해줘", "현황 알려줘"만 있으면 SQL 타입으로 분류 (일반 텍스트 답변)
-   
-3. **GENERAL_CHAT**: 데이터베이스와 무관한 일반 질문 (예: "파이썬이 뭐야?", "날씨 알려줘")
-   - 스키마, 발주, 입고, 품목 등과 무관한 질문
-   - 이 경우 chat_answer에 직접 답변을 생성하세요
-
-중요 규칙:
-- 반드시 아래 JSON 형식으로만 응답하세요.
-- action_type이 GENERAL_CHAT인 경우에만 chat_answer를 작성하세요.
-- action_type이 SQL 또는 REPORT인 경우 query에 원본 질문을 그대로 반환하세요.
-- JSON 외의 다른 텍스트는 포함하지 마세요.
-- **REPORT는 반드시 "보고서/차트/문서 만들기" 같은 명시적 요청이 있을 때만 사용하세요.**
-
-응답 형식 (JSON):
-{{
-    "action_type": "SQL" | "REPORT" | "GENERAL_CHAT",
-    "chat_answer": "GENERAL_CHAT인 경우에만 답변",
-    "query": "SQL 또는 REPORT인 경우 원본 질문"
-}}"""
+        prompt = _CLASSIFY_AND_ACT_TMPL.format(query=query, schema_hints=schema_hints)
 
         if self.provider == "gemini":
             messages = [HumanMessage(content=prompt)]
-            response = self.model.invoke(messages)
+            response = self._invoke(messages, self._json_model(_CLASSIFY_AND_ACT_SCHEMA))
             content = response.content.strip() if hasattr(response, 'content') else str(response)
-            
-            # JSON 추출 (마크다운 코드 블록 제거)
-            if content.startswith("```"):
-                lines = content.split("\n")
-                content = "\n".join(lines[1:-1]) if len(lines) > 2 else content
-            if content.startswith("```json"):
-                lines = content.split("\n")
-                content = "\n".join(lines[1:-1]) if len(lines) > 2 else content
-            
-            # JSON 파싱
-            try:
-                result = json.loads(content)
-                # 필수 필드 검증
-                if "action_type" not in result:
-                    raise ValueError("action_type 필드가 없습니다.")
-                
-                # action_type 검증
-                if result["action_type"] not in ["SQL", "REPORT", "GENERAL_CHAT"]:
-                    raise ValueError(f"잘못된 action_type: {result['action_type']}")
-                
-                return result
-            except json.JSONDecodeError as e:
-                print(f"⚠️  JSON 파싱 오류: {e}")
-                print(f"응답 내용: {content}")
-                # JSON 파싱 실패 시 기본값 반환
-                return {
-                    "action_type": "GENERAL_CHAT",
-                    "chat_answer": "죄송합니다. 질문을 이해하는데 문제가 발생했습니다. 다시 질문해주세요.",
-                    "query": None
-                }
+            result = self._parse_classification(content)
+            if result.get("sql"):
+                result["sql"] = self._strip_code_fence(result["sql"].strip())
+            return result
         else:
             raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
     
+    def _parse_classification(self, content: str) -> Dict[str, Any]:
+        """분류 응답 파싱 및 검증 (코드 블록 제거 후 파싱, 파싱 실패 시 GENERAL_CHAT 기본값)"""
+        try:
+            result = orjson.loads(self._strip_code_fence(content))
+            # 필수 필드 검증
+            if "action_type" not in result:
+                raise ValueError("action_type 필드가 없습니다.")
+            
+            # action_type 검증
+            if result["action_type"] not in ["SQL", "REPORT", "GENERAL_CHAT"]:
+                raise ValueError(f"잘못된 action_type: {result['action_type']}")
+            
+            return result
+        except orjson.JSONDecodeError as e:
+            logger.debug("응답 내용: %s", content)
+            logger.warning("JSON 파싱 오류: %s", e)
+            # JSON 파싱 실패 시 기본값 반환
+            return self._classification_fallback()
+    
+    @staticmethod
+    def _classification_fallback() -> Dict[str, Any]:
+        """분류 실패 시 기본 응답 (parse_failed로 정상 분류 결과와 구분)"""
+        return {
+            "action_type": "GENERAL_CHAT",
+            "chat_answer": "죄송합니다. 질문을 이해하는데 문제가 발생했습니다. 다시 질문해주세요.",
+            "query": None,
+            "parse_failed": True
+        }
+    
     def generate_report(self, query: str, data: Optional[str] = None) -> Tuple[str, Optional[str]]:
         """
         Gemini에게 HTML 기반 보고서를 요청
@@ -402,92 +842,230 @@ SQL 쿼리:"""
         Returns:
             Tuple(summary_text, html_report)
         """
-        print(f"📝 generate_report 호출: query={query[:50]}..., data={data is not None}")
+        logger.debug("generate_report 호출: query=%s, data=%s", query, data is not None)
         
         try:
-            base_instructions = """
-응답은 반드시 아래 JSON 형식을 따르세요:
-{
-  "summary": "<자연어 요약 (마크다운 허용)>",
-  "html_report": "<!DOCTYPE html>로 시작하는 완전한 HTML 문서 문자열>",
-  "notes": "<선택 사항>"
-}
-
-HTML 규칙:
-- 완전한 HTML 문서 구조를 포함하세요 (<html>, <head>, <body>).
-- 기본 스타일을 위해 inline CSS를 head에 포함하세요 (폰트, 색상, 카드 스타일 등).
-- 최소 1개의 데이터 요약 표를 포함하세요.
-- 가능하면 간단한 막대/bar 스타일 차트를 CSS로 표현하세요 (예: div 막대).
-- 외부 라이브러리는 사용하지 마세요. 순수 HTML/CSS만 사용하세요.
-- 데이터가 없으면 합리적인 가상 수치를 사용하지만, 가상의 값임을 명시하세요.
-"""
             if data:
-                print("📝 데이터 기반 보고서 프롬프트 생성 중...")
-                prompt = f"""다음 질문과 데이터를 바탕으로 HTML 보고서를 작성해주세요.
-
-질문: {query}
-
-데이터:
-{data}
-
-{base_instructions}
-"""
+                prompt = _REPORT_DATA_TMPL.format(query=query, data=data)
             else:
-                print("📝 텍스트 기반 보고서 프롬프트 생성 중...")
-                prompt = f"""다음 질문에 대한 HTML 보고서를 작성해주세요.
-
-질문: {query}
+                prompt = _REPORT_TEXT_TMPL.format(query=query)
 
-{base_instructions}
-"""
-
-            print("📝 Gemini API 호출 중...")
             if self.provider != "gemini":
                 raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
             
             messages = [HumanMessage(content=prompt)]
-            response = self.model.invoke(messages)
+            response = self._invoke(messages, self._json_model(_REPORT_SCHEMA))
             raw_output = response.content.strip() if hasattr(response, 'content') else str(response)
-            print(f"✅ Gemini API 응답 수신: 길이={len(raw_output)} 문자")
-            
-            # 코드 블록 제거
-            if raw_output.startswith("```"):
-                lines = raw_output.split("\n")
-                raw_output = "\n".join(lines[1:-1]) if len(lines) > 2 else raw_output
-            if raw_output.startswith("```json"):
-                lines = raw_output.split("\n")
-                raw_output = "\n".join(lines[1:-1]) if len(lines) > 2 else raw_output
+            logger.debug("Gemini API 응답 수신: 길이=%d 문자", len(raw_output))
             
             summary_text = ""
             html_report: Optional[str] = None
             
             try:
-                report_data = json.loads(raw_output)
+                report_data = orjson.loads(self._strip_code_fence(raw_output))
                 summary_text = report_data.get("summary", "").strip()
                 html_report = report_data.get("html_report")
                 notes = report_data.get("notes")
                 
                 if notes:
                     summary_text = f"{summary_text}\n\n[추가 안내]\n{notes}"
-                
-                print("✅ JSON 파싱 완료")
-            except json.JSONDecodeError:
-                print("⚠️  JSON 파싱 실패, 원문을 그대로 사용합니다.")
+            except orjson.JSONDecodeError:
+                logger.warning("보고서 JSON 파싱 실패, 원문을 그대로 사용합니다.")
                 summary_text = raw_output
             
             if not html_report:
-                print("⚠️  html_report 없음, 기본 HTML 템플릿 생성")
+                logger.debug("html_report 없음, 기본 HTML 템플릿 생성")
                 html_report = self._build_basic_html(summary_text)
             else:
-                html_report = self._normalize_html(html_report)
+                html_report = self._normalize(html_report, treat_as_html=True)
             
-            print(f"✅ generate_report 완료: 요약 길이={len(summary_text)} 문자, HTML 길이={len(html_report)} 문자")
+            logger.debug(
+                "generate_report 완료: 요약 길이=%d 문자, HTML 길이=%d 문자",
+                len(summary_text), len(html_report)
+            )
             return summary_text, html_report
-        except Exception as e:
-            import traceback
-            print(f"❌ generate_report 오류: {e}")
-            print(f"❌ 상세 오류: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("generate_report 오류")
+            raise
+
+    async def stream_report(self, query: str, data: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        HTML 보고서 생성 (스트리밍)
+        
+        JSON 모드 대신 HTML 문서만 출력하도록 요청하고, Gemini 스트리밍 응답을
+        완성된 줄 단위로 반환합니다. 요약(summary)은 생성하지 않습니다.
+        
+        Args:
+            query: 사용자 질문
+            data: DB 조회 결과 데이터 (JSON 문자열, 선택사항)
+            
+        Yields:
+            HTML 보고서 조각 (줄 단위, 줄바꿈 포함)
+        """
+        if self.provider != "gemini":
+            raise ValueError(f"지원하지 않는 LLM 제공자: {self.provider}")
+        
+        if data:
+            prompt = _REPORT_STREAM_DATA_TMPL.format(query=query, data=data)
+        else:
+            prompt = _REPORT_STREAM_TEXT_TMPL.format(query=query)
+        messages = [HumanMessage(content=prompt)]
+        buffer = ""
+        
+        async for text in self._astream(messages):
+            lines, buffer = self._take_lines(buffer + text)
+            for line in lines:
+                # 지시를 어기고 코드 블록으로 감싼 경우 펜스 줄은 버림
+                if line.lstrip().startswith("```"):
+                    continue
+                yield self._normalize(line, treat_as_html=True) + "\n"
+        
+        if buffer.strip() and not buffer.lstrip().startswith("```"):
+            yield self._normalize(buffer.rstrip(), treat_as_html=True)
+    
+    @staticmethod
+    def _take_lines(buffer: str) -> Tuple[List[str], str]:
+        """스트리밍 버퍼에서 완성된 줄들과 아직 줄바꿈이 오지 않은 나머지를 분리"""
+        if "\n" not in buffer:
+            return [], buffer
+        done, _, rest = buffer.rpartition("\n")
+        return done.split("\n"), rest
+    
+    def _stream_lines(self, messages) -> Iterator[str]:
+        """Gemini 스트리밍 응답을 줄 단위로 반환 (마지막 줄은 줄바꿈 없이 끝날 수 있음)"""
+        buffer = ""
+        for text in self._stream(messages):
+            lines, buffer = self._take_lines(buffer + text)
+            yield from lines
+        if buffer:
+            yield buffer
+    
+    def _acquire_slot(self) -> None:
+        """
+        동시 요청 슬롯 확보 (GEMINI_INFLIGHT_TIMEOUT 동안 자리가 나지 않으면 TimeoutError)
+        
+        슬롯을 쥔 호출이 다른 Gemini 호출을 기다리는 경로가 생겨도 스레드가 영원히 멈추지 않고 오류로 끝나도록 합니다.
+        """
+        if not self._inflight.acquire(timeout=self._inflight_timeout):
+            raise TimeoutError(f"Gemini 동시 호출 슬롯을 {self._inflight_timeout:g}초 안에 얻지 못했습니다.")
+    
+    async def _aacquire_slot(self) -> None:
+        """_acquire_slot의 비동기 버전 (대기 중 이벤트 루프를 막지 않음)"""
+        deadline = time.monotonic() + self._inflight_timeout
+        while not self._inflight.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Gemini 동시 호출 슬롯을 {self._inflight_timeout:g}초 안에 얻지 못했습니다.")
+            await asyncio.sleep(0.05)
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """스트리밍 조각의 텍스트"""
+        return chunk.content if hasattr(chunk, 'content') else str(chunk)
+    
+    def _open_stream(self, messages) -> Tuple[Iterator, Any]:
+        """
+        Gemini 스트리밍 호출을 시작해 (나머지 조각 iterator, 첫 조각)을 반환
+        
+        _invoke와 같은 분당/동시 요청 수 제한을 적용하고, 동시 요청 슬롯은 _stream이 스트림을 다 읽은 뒤 반환합니다.
+        429 재시도는 SDK가 스트림을 여는 요청에서만 하므로 이미 보낸 조각이 다시 오지 않습니다.
+        """
+        self._rate_limiter.acquire()
+        self._acquire_slot()
+        try:
+            chunks = iter(self.model.stream(messages))
+            return chunks, next(chunks, None)
+        except BaseException:
+            self._inflight.release()
             raise
+    
+    def _stream(self, messages) -> Iterator[str]:
+        """Gemini 스트리밍 호출 (제한/재시도는 _open_stream 참고)"""
+        chunks, first = self._open_stream(messages)
+        try:
+            if first is None:
+                return
+            yield self._chunk_text(first)
+            for chunk in chunks:
+                yield self._chunk_text(chunk)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+            self._inflight.release()
+    
+    async def _aopen_stream(self, messages) -> Tuple[AsyncIterator, Any]:
+        """_open_stream의 비동기 버전 (제한 대기 중에도 이벤트 루프를 막지 않음)"""
+        await self._rate_limiter.acquire_async()
+        await self._aacquire_slot()
+        try:
+            chunks = self.model.astream(messages).__aiter__()
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            return chunks, first
+        except BaseException:
+            self._inflight.release()
+            raise
+    
+    async def _astream(self, messages) -> AsyncIterator[str]:
+        """Gemini 비동기 스트리밍 호출 (제한/재시도는 _open_stream 참고)"""
+        chunks, first = await self._aopen_stream(messages)
+        try:
+            if first is None:
+                return
+            yield self._chunk_text(first)
+            async for chunk in chunks:
+                yield self._chunk_text(chunk)
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+            self._inflight.release()
+    
+    def _invoke(self, messages, model=None):
+        """
+        Gemini 호출 (분당 요청 수/동시 요청 수 제한)
+        
+        429 등 일시 오류는 langchain-google-genai가 내부에서 재시도합니다(gemini_retry 참고).
+        SDK 재시도는 이 제한 안에서 일어나므로 그동안 동시 요청 슬롯을 계속 쥐고 분당 요청 수에는 한 번만 잡힙니다.
+        """
+        self._rate_limiter.acquire()
+        self._acquire_slot()
+        try:
+            return (model or self.model).invoke(messages)
+        finally:
+            self._inflight.release()
+
+    def _json_model(self, schema: Dict[str, Any]):
+        """
+        응답을 주어진 JSON Schema로 강제하는 Gemini JSON 모드 모델 반환
+
+        response_mime_type/response_schema는 google-generativeai 0.5 이상에서만 전달됩니다
+        (requirements.txt 고정 버전). 프롬프트의 JSON 형식 지침과 코드 블록 제거는 그대로 둡니다.
+        """
+        return self.model.bind(
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": schema,
+            }
+        )
+
+    @staticmethod
+    def _strip_code_fence(s: str) -> str:
+        """
+        응답을 감싼 마크다운 코드 블록(```sql ... ``` 또는 ``` ... ```)을 제거
+        
+        첫 줄은 ```로 시작할 때만, 마지막 줄은 정확히 ```일 때만 제거합니다.
+        """
+        if not s.startswith("```"):
+            return s
+        first_nl = s.find("\n")
+        if first_nl == -1:
+            return s
+        body = s[first_nl + 1:].rstrip()
+        last_nl = body.rfind("\n")
+        if body[last_nl + 1:].strip() == "```":
+            body = body[:last_nl] if last_nl != -1 else ""
+        return body.strip()
 
     def _build_basic_html(self, summary: str) -> str:
         """요약 텍스트 기반 기본 HTML 템플릿 생성"""
@@ -528,75 +1106,33 @@ HTML 규칙:
 </body>
 </html>"""
 
-    def _normalize_text_with_html(self, text: str) -> str:
-        """일반 텍스트 응답의 마크다운 스타일(**bold**)을 HTML 태그로 치환"""
+    @staticmethod
+    def _normalize(text: str, treat_as_html: bool) -> str:
+        """
+        마크다운 스타일(**bold**)을 HTML 태그로 치환
+        
+        Args:
+            text: LLM 응답 텍스트 또는 HTML 보고서
+            treat_as_html: True면 HTML 보고서로 취급 (월별 항목 변환 및 줄바꿈 변환 생략)
+        """
         if not text:
             return text
         
-        # 1. 리스트 형식의 제품명과 금액 강조: "1. **제품명**: 금액원" -> "1. <strong>제품명</strong>: <strong>금액원</strong>"
-        def repl_list_item(match):
-            num = match.group(1)  # 숫자.
-            product = match.group(2)  # 제품명
-            amount = match.group(3)  # 금액
-            return f"{num}<strong>{product}</strong>: <strong>{amount}</strong>"
-        
-        # 패턴: 숫자. **제품명**: 금액원 (금액은 숫자와 쉼표, 원 포함)
-        text = re.sub(
-            r"(\d+\.\s+)\*\*(.+?)\*\*:\s+([\d,]+원)",
-            repl_list_item,
-            text,
-            flags=re.MULTILINE
-        )
-        
-        # 2. 리스트 형식의 월별 데이터 강조: "*   **1월:** 32,400.0" -> "*   <strong>1월:</strong> 32,400.0"
-        def repl_month_item(match):
-            month = match.group(1)  # 월
-            value = match.group(2)  # 값
-            return f"*   <strong>{month}:</strong> {value}"
-        
-        # 패턴: *   **월:** 값
-        text = re.sub(
-            r"\*\s+\*\*(\d+월):\*\*\s+([\d,\.]+)",
-            repl_month_item,
-            text,
-            flags=re.MULTILINE
-        )
-        
-        # 3. 일반 **bold** -> <strong>bold</strong>
-        def repl(match):
-            return f"<strong>{match.group(1)}</strong>"
-        text = re.sub(r"\*\*(.+?)\*\*", repl, text, flags=re.DOTALL)
+        if "**" in text:
+            # 1. 리스트 형식의 제품명과 금액 강조
+            text = _LIST_ITEM_RE.sub(_repl_list_item, text)
+            
+            # 2. 리스트 형식의 월별 데이터 강조 (일반 텍스트만)
+            if not treat_as_html:
+                text = _MONTH_ITEM_RE.sub(_repl_month_item, text)
+            
+            # 3. 일반 **bold** -> <strong>bold</strong>
+            text = _BOLD_RE.sub(_repl_bold, text)
         
         # 4. 줄바꿈을 <br>로 변환 (HTML이 아닌 경우)
-        if "<html" not in text.lower() and "<div" not in text.lower():
-            text = text.replace("\n", "<br>")
+        if not treat_as_html and "\n" in text:
+            lowered = text.lower()
+            if "<html" not in lowered and "<div" not in lowered:
+                text = text.replace("\n", "<br>")
         
         return text
-    
-    def _normalize_html(self, html: str) -> str:
-        """HTML 보고서의 마크다운 스타일(**bold**)을 HTML 태그로 치환"""
-        if not html:
-            return html
-        
-        # 1. 리스트 형식의 제품명과 금액 강조: "1. **제품명**: 금액원" -> "1. <strong>제품명</strong>: <strong>금액원</strong>"
-        def repl_list_item(match):
-            num = match.group(1)  # 숫자.
-            product = match.group(2)  # 제품명
-            amount = match.group(3)  # 금액
-            return f"{num}<strong>{product}</strong>: <strong>{amount}</strong>"
-        
-        # 패턴: 숫자. **제품명**: 금액원 (금액은 숫자와 쉼표, 원 포함)
-        html = re.sub(
-            r"(\d+\.\s+)\*\*(.+?)\*\*:\s+([\d,]+원)",
-            repl_list_item,
-            html,
-            flags=re.MULTILINE
-        )
-        
-        # 2. 일반 **bold** -> <strong>bold</strong>
-        def repl(match):
-            return f"<strong>{match.group(1)}</strong>"
-        html = re.sub(r"\*\*(.+?)\*\*", repl, html, flags=re.DOTALL)
-        
-        return html
-
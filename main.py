@@ -4,52 +4,125 @@ FastAPI를 사용한 REST API 서버
 """
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, field_validator, model_validator
-from typing import Optional
-import uvicorn
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Type, TypeVar
+import asyncio
 import json
-from rag_service import RAGService
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import msgspec
+import orjson
+import uvicorn
+from rag_service import BatchedEmbedder, RAGService, SemanticCache
 from llm_service import LLMService
 from config import settings
 
 
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="hcManAi",
     description="AI 마이크로서비스 - Text-to-SQL 및 데이터 요약",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+
+class RawBodyMiddleware:
+    """
+    요청 본문을 한 번만 읽어 scope["state"]["raw_body"](= request.state.raw_body)에 보관
+    
+    이후 앱에는 보관한 본문을 그대로 전달하므로, 엔드포인트와 오류 핸들러가
+    스트림을 다시 읽지 않고 같은 바이트를 재사용할 수 있습니다.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        chunks = []
+        message = await receive()
+        while message["type"] == "http.request":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+            message = await receive()
+        body = b"".join(chunks)
+        scope.setdefault("state", {})["raw_body"] = body
+        
+        # 첫 receive에는 보관한 본문(또는 읽는 중 받은 연결 종료)을 돌려주고, 이후는 원래 receive로 위임
+        first = {"type": "http.request", "body": body, "more_body": False} if message["type"] == "http.request" else message
+        replayed = False
+        
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return first
+            return await receive()
+        
+        await self.app(scope, replay, send)
+
+
+app.add_middleware(RawBodyMiddleware)
+
 # 전역 서비스 인스턴스
+# 블로킹 호출(Gemini, ChromaDB)은 asyncio.to_thread로 실행하므로 여러 스레드에서 공유됨
+# (LLMService/RAGService 캐시는 lock으로 스레드 안전)
 rag_service: Optional[RAGService] = None
 llm_service: Optional[LLMService] = None
+embedder: Optional[BatchedEmbedder] = None  # 동시 요청의 질문 임베딩을 모아서 전송
+
+# 질문 결과 캐시 (엔드포인트마다 payload 형태가 달라 분리, SQL/답변을 담으므로 정확 일치로만 조회)
+classify_cache = SemanticCache()  # /classify-query: 분류 결과
+query_cache = SemanticCache()  # /query: QueryResponse 필드
 
 
 @app.on_event("startup")
 async def startup_event():
     """서버 시작 시 초기화"""
-    global rag_service, llm_service
+    global rag_service, llm_service, embedder
     try:
-        rag_service = RAGService()
+        # asyncio.to_thread로 실행하는 Gemini/ChromaDB 호출의 동시 스레드 수 상한
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=settings.LLM_WORKERS, thread_name_prefix="hcmanai")
+        )
         llm_service = LLMService()
-        print("✅ 서비스 초기화 완료")
-    except Exception as e:
-        print(f"❌ 서비스 초기화 실패: {e}")
+        rag_service = RAGService(llm_service=llm_service)
+        embedder = BatchedEmbedder(rag_service.generate_query_embeddings)
+        embedder.start()
+        logger.info("서비스 초기화 완료")
+    except Exception:
+        logger.exception("서비스 초기화 실패")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 백그라운드 작업 정리"""
+    if embedder is not None:
+        await embedder.stop()
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """요청 유효성 검증 오류 핸들러"""
-    print(f"❌ 요청 유효성 검증 실패:")
-    print(f"   URL: {request.url}")
-    print(f"   Method: {request.method}")
-    try:
-        body = await request.body()
-        print(f"   요청 본문: {body.decode('utf-8')}")
-    except Exception as e:
-        print(f"   요청 본문 읽기 실패: {e}")
-    print(f"   오류 상세: {exc.errors()}")
+    logger.warning("요청 유효성 검증 실패: %s %s errors=%s", request.method, request.url, exc.errors())
+    if logger.isEnabledFor(logging.DEBUG):
+        # 본문은 RawBodyMiddleware가 읽어 둔 것을 재사용 (스트림 재읽기 없음)
+        body = getattr(request.state, "raw_body", b"")
+        logger.debug("요청 본문: %s", body.decode("utf-8", errors="replace"))
     
     # 오류 메시지를 JSON 직렬화 가능한 형태로 변환
     errors = []
@@ -71,6 +144,62 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+def _wants_event_stream(request: Request) -> bool:
+    """클라이언트가 SSE 스트리밍 응답을 요청했는지 확인"""
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    """Server-Sent Events 형식의 이벤트 문자열 생성"""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def _report_events(
+    query_text: str,
+    data: Optional[str],
+    sql_call: Optional[Awaitable[str]] = None
+) -> AsyncIterator[str]:
+    """
+    보고서 SSE 이벤트 생성: sql(있을 때) → html 조각들 → done({"query", "sql"})
+    
+    보고서 스트림은 SQL 생성이 끝난 뒤에 엽니다. 스트림은 다 읽을 때까지 동시 요청 슬롯을 쥐고 있으므로,
+    먼저 열어 두면 슬롯이 필요한 SQL 생성과 서로를 기다리며 멈출 수 있습니다.
+    """
+    sql = None
+    try:
+        if sql_call is not None:
+            sql = await sql_call
+            yield _sse_event(sql, "sql")
+        async for chunk in llm_service.stream_report(query_text, data):
+            yield _sse_event(chunk, "html")
+        yield _sse_event(orjson.dumps({"query": query_text, "sql": sql}).decode(), "done")
+    except Exception as e:
+        logger.exception("보고서 스트리밍 중 오류 발생")
+        yield _sse_event(f"보고서 생성 중 오류 발생: {e}", "error")
+
+
+def _summary_events(query_text: str, data: str) -> Iterator[str]:
+    """
+    요약 SSE 이벤트 생성: 답변 조각들 → done
+    
+    스트리밍 도중 Gemini 오류가 나면 응답이 끊기지 않도록 error 이벤트를 보낸 뒤 done으로 끝냅니다.
+    """
+    try:
+        for chunk in llm_service.summarize_stream(query_text, data):
+            yield _sse_event(chunk)
+    except Exception as e:
+        logger.exception("요약 스트리밍 중 오류 발생")
+        yield _sse_event(f"요약 생성 중 오류 발생: {e}", "error")
+    yield _sse_event("", "done")
+
+
+def _embedding_for(text: str, user_query: str, query_embedding: Optional[List[float]]) -> Optional[List[float]]:
+    """LLM이 질문을 다듬지 않았을 때만 원본 질문 임베딩을 재사용"""
+    return query_embedding if text == user_query else None
+
+
 # Request/Response 모델
 class GenerateSQLRequest(BaseModel):
     query: str
@@ -166,6 +295,92 @@ class GenerateReportResponse(BaseModel):
     report_html: Optional[str] = None  # 생성된 HTML 보고서
 
 
+# 요청 본문 파싱용 msgspec 구조체 (QPS가 높은 엔드포인트)
+# 위 Pydantic 요청 모델은 OpenAPI 문서용으로만 사용
+class QueryPayload(msgspec.Struct):
+    """/query 요청 본문"""
+    question: str
+
+
+class ClassifyQueryPayload(msgspec.Struct):
+    """/classify-query 요청 본문 (정의되지 않은 필드는 무시)"""
+    question: Optional[str] = None
+    query: Optional[str] = None
+    message: Optional[str] = None
+    data: Optional[str] = None
+    
+    def __post_init__(self):
+        """question, query, message 중 하나는 필수"""
+        if not self.question and not self.query and not self.message:
+            raise ValueError("question, query 또는 message 필드 중 하나는 필수입니다.")
+    
+    def get_query(self) -> str:
+        """question, query 또는 message 필드에서 질문을 가져옴 (우선순위: question > query > message)"""
+        return self.question or self.query or self.message
+
+
+class GenerateReportPayload(msgspec.Struct):
+    """/generate-report 요청 본문"""
+    query: str
+    data: str
+
+
+PayloadT = TypeVar("PayloadT", bound=msgspec.Struct)
+
+
+def _openapi_body(model: Type[BaseModel]) -> Dict[str, Any]:
+    """msgspec으로 직접 파싱하는 엔드포인트의 요청 본문 스키마를 Pydantic 모델로 문서화"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}}
+        }
+    }
+
+
+def _decode_body(raw: bytes, payload_type: Type[PayloadT], model: Type[BaseModel]) -> PayloadT:
+    """
+    요청 본문을 msgspec으로 파싱 (실패 시 422 응답용 RequestValidationError)
+    
+    Args:
+        raw: 요청 본문
+        payload_type: 파싱할 msgspec 구조체
+        model: 같은 필드의 Pydantic 요청 모델 (실패 시 오류 목록 생성용)
+    """
+    try:
+        return msgspec.json.decode(raw, type=payload_type)
+    except (msgspec.ValidationError, msgspec.DecodeError):
+        raise RequestValidationError(_body_errors(raw, model))
+
+
+def _body_errors(raw: bytes, model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    파싱에 실패한 본문의 오류 목록을 FastAPI/Pydantic 검증과 같은 형태로 생성
+    
+    클라이언트는 loc/type으로 오류 필드를 판단하므로(예: 누락 시 type "missing", loc ["body", "question"])
+    실패한 요청만 Pydantic 모델로 다시 검증합니다.
+    """
+    if not raw:
+        return [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+    try:
+        body = json.loads(raw)
+    except json.JSONDecodeError as e:
+        return [{
+            "type": "json_invalid",
+            "loc": ("body", e.pos),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": e.msg}
+        }]
+    try:
+        # FastAPI 본문 검증과 같은 방식 (객체가 아닌 본문은 model_attributes_type 오류)
+        model.model_validate(body, from_attributes=True)
+    except ValidationError as e:
+        return [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+    # msgspec만 거부한 경우 (예: UTF-8이 아닌 본문)
+    return [{"type": "value_error", "loc": ("body",), "msg": "Invalid request body", "input": body}]
+
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -182,6 +397,27 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.post("/cache/clear")
+async def clear_cache():
+    """
+    캐시 초기화 API (관리용)
+    
+    질문 분류 캐시, SQL/스키마 힌트 캐시, 질문 결과 캐시를 모두 비우고 스키마 스냅샷을 다시 로드합니다.
+    (ingest_schema.py로 스키마를 다시 적재한 뒤 호출)
+    요청을 처리한 워커 프로세스만 갱신되므로, API_WORKERS가 2 이상이면 재적재 후 서버를 재시작하세요.
+    응답에는 초기화 직전의 분류 캐시 적중 통계가 포함됩니다.
+    """
+    if rag_service is None or llm_service is None:
+        raise HTTPException(status_code=500, detail="서비스가 초기화되지 않았습니다.")
+    
+    stats = {"classify": classify_cache.stats(), **llm_service.cache_stats()}
+    llm_service.clear_caches()
+    await asyncio.to_thread(rag_service.invalidate)
+    classify_cache.clear()
+    query_cache.clear()
+    return {"status": "cleared", "llm_cache_stats": stats}
+
+
 @app.post("/generate-sql", response_model=GenerateSQLResponse)
 async def generate_sql(request: GenerateSQLRequest):
     """
@@ -199,32 +435,31 @@ async def generate_sql(request: GenerateSQLRequest):
     
     try:
         # 1. 질문 유형 판단 (스키마 관련 질문인지 확인)
-        is_schema_query = llm_service.is_schema_related_query(request.query)
-        print(f"🔍 질문 유형 판단: {'스키마 관련 질문' if is_schema_query else '일반 질문'}")
+        is_schema_query = await asyncio.to_thread(llm_service.is_schema_related_query, request.query)
+        logger.debug("질문 유형 판단: %s", "스키마 관련 질문" if is_schema_query else "일반 질문")
         
         if not is_schema_query:
             # 일반 질문이면 특별한 HTTP 상태 코드 반환 (Java에서 감지 가능하도록)
-            print(f"ℹ️  일반 질문으로 판단됨. /chat 엔드포인트 사용을 권장합니다.")
+            logger.debug("일반 질문으로 판단됨. /chat 엔드포인트 사용을 권장합니다.")
             raise HTTPException(
                 status_code=400, 
                 detail="GENERAL_QUESTION: 이 질문은 일반 질문입니다. /chat 엔드포인트를 사용해주세요."
             )
         
         # 2. 스키마 관련 질문이면 SQL 생성
-        sql = rag_service.generate_sql(request.query)
-        return GenerateSQLResponse(sql=sql)
+        sql = await asyncio.to_thread(rag_service.generate_sql, request.query)
+        # trusted: LLM+internal
+        return GenerateSQLResponse.model_construct(sql=sql)
     except HTTPException:
         # HTTPException은 그대로 전달
         raise
     except Exception as e:
-        import traceback
-        error_detail = f"SQL 생성 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ 에러 상세: {error_detail}")
+        logger.exception("SQL 생성 중 오류 발생")
         raise HTTPException(status_code=500, detail=f"SQL 생성 중 오류 발생: {str(e)}")
 
 
 @app.post("/summarize", response_model=SummarizeResponse)
-async def summarize(request: SummarizeRequest):
+async def summarize(request: SummarizeRequest, http_request: Request):
     """
     결과 요약 API
     
@@ -232,13 +467,21 @@ async def summarize(request: SummarizeRequest):
     
     - LLM에게 질문과 데이터를 전달
     - 자연스러운 한국어 답변 생성
+    - Accept: text/event-stream 요청 시 답변을 생성되는 대로 SSE로 전송 (답변 조각 → done, 오류 시 error → done)
     """
     if llm_service is None:
         raise HTTPException(status_code=500, detail="LLM 서비스가 초기화되지 않았습니다.")
     
+    if _wants_event_stream(http_request):
+        return StreamingResponse(
+            _summary_events(request.query, request.data),
+            media_type="text/event-stream"
+        )
+    
     try:
-        response = llm_service.summarize(request.query, request.data)
-        return SummarizeResponse(response=response)
+        response = await asyncio.to_thread(llm_service.summarize, request.query, request.data)
+        # trusted: LLM+internal
+        return SummarizeResponse.model_construct(response=response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"요약 생성 중 오류 발생: {str(e)}")
 
@@ -257,17 +500,16 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail="LLM 서비스가 초기화되지 않았습니다.")
     
     try:
-        answer = llm_service.chat(request.question)
-        return ChatResponse(answer=answer)
+        answer = await asyncio.to_thread(llm_service.chat, request.question)
+        # trusted: LLM+internal
+        return ChatResponse.model_construct(answer=answer)
     except Exception as e:
-        import traceback
-        error_detail = f"일반 질문 답변 생성 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ 에러 상세: {error_detail}")
+        logger.exception("일반 질문 답변 생성 중 오류 발생")
         raise HTTPException(status_code=500, detail=f"일반 질문 답변 생성 중 오류 발생: {str(e)}")
 
 
-@app.post("/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+@app.post("/query", response_model=QueryResponse, openapi_extra=_openapi_body(QueryRequest))
+async def query(http_request: Request):
     """
     통합 질문 API
     
@@ -286,36 +528,44 @@ async def query(request: QueryRequest):
     if rag_service is None or llm_service is None:
         raise HTTPException(status_code=500, detail="서비스가 초기화되지 않았습니다.")
     
+    request = _decode_body(http_request.state.raw_body, QueryPayload, QueryRequest)
+    
     try:
+        # 0. 캐시 확인 (정확 일치만, SQL/답변은 유사 질문에 재사용하지 않음)
+        cached = query_cache.get(request.question)
+        if cached is not None:
+            logger.debug("질문 캐시 적중")
+            # trusted: LLM+internal
+            return QueryResponse.model_construct(**cached)
+        
         # 1. 질문 유형 판단
-        is_schema_query = llm_service.is_schema_related_query(request.question)
-        print(f"🔍 질문 유형 판단: {'스키마 관련 질문' if is_schema_query else '일반 질문'}")
+        is_schema_query = await asyncio.to_thread(llm_service.is_schema_related_query, request.question)
+        logger.debug("질문 유형 판단: %s", "스키마 관련 질문" if is_schema_query else "일반 질문")
         
         if is_schema_query:
             # 2-1. 스키마 관련 질문이면 SQL 생성
-            sql = rag_service.generate_sql(request.question)
-            return QueryResponse(
-                question_type="schema",
-                sql=sql,
-                answer=None
-            )
+            query_embedding = await embedder.embed(request.question)
+            sql = await asyncio.to_thread(rag_service.generate_sql, request.question, query_embedding)
+            result = {"question_type": "schema", "sql": sql, "answer": None}
         else:
             # 2-2. 일반 질문이면 답변 생성
-            answer = llm_service.chat(request.question)
-            return QueryResponse(
-                question_type="general",
-                sql=None,
-                answer=answer
-            )
+            answer = await asyncio.to_thread(llm_service.chat, request.question)
+            result = {"question_type": "general", "sql": None, "answer": answer}
+        
+        query_cache.put(request.question, result)
+        # trusted: LLM+internal
+        return QueryResponse.model_construct(**result)
     except Exception as e:
-        import traceback
-        error_detail = f"질문 처리 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ 에러 상세: {error_detail}")
+        logger.exception("질문 처리 중 오류 발생")
         raise HTTPException(status_code=500, detail=f"질문 처리 중 오류 발생: {str(e)}")
 
 
-@app.post("/classify-query", response_model=QueryClassificationResponse)
-async def classify_query(request: ClassifyQueryRequest):
+@app.post(
+    "/classify-query",
+    response_model=QueryClassificationResponse,
+    openapi_extra=_openapi_body(ClassifyQueryRequest)
+)
+async def classify_query(http_request: Request):
     """
     질문 분류 API
     
@@ -325,6 +575,7 @@ async def classify_query(request: ClassifyQueryRequest):
     - SQL: 단순 데이터 조회 질문 → query에 원본 질문 반환
     - REPORT: 분석/보고서가 필요한 복합 질문 → 보고서 생성 후 chat_answer에 반환
     - GENERAL_CHAT: 일반 대화 질문 → chat_answer에 답변 반환
+    - REPORT + data + Accept: text/event-stream → sql → html 조각 → done 이벤트를 SSE로 전송
     
     Returns:
         QueryClassificationResponse:
@@ -335,15 +586,31 @@ async def classify_query(request: ClassifyQueryRequest):
     if rag_service is None or llm_service is None:
         raise HTTPException(status_code=500, detail="서비스가 초기화되지 않았습니다.")
     
+    request = _decode_body(http_request.state.raw_body, ClassifyQueryPayload, ClassifyQueryRequest)
+    
     try:
         # query 또는 message 필드에서 질문 추출
         user_query = request.get_query()
-        print(f"📥 classify-query 요청 수신: query={user_query}")
+        logger.debug("classify-query 요청 수신: query=%s", user_query)
         
-        # 1. 질문 분류
-        classification = llm_service.classify_query(user_query)
+        # 1. 질문 분류 (SQL 질문이면 같은 호출에서 SQL까지 생성, 같은 질문은 캐시 재사용)
+        # 질문 임베딩은 요청당 한 번만 계산해 스키마 검색/SQL 생성에 재사용
+        query_embedding = None
+        classification = classify_cache.get(user_query)
+        if classification is None:
+            query_embedding = await embedder.embed(user_query)
+            schema_hints = await asyncio.to_thread(rag_service.build_schema_hints, user_query, query_embedding)
+            classification = await asyncio.to_thread(llm_service.classify_and_act, user_query, schema_hints)
+            # 파싱 실패로 만들어진 기본 응답은 캐시하지 않음
+            if not classification.get("parse_failed"):
+                classify_cache.put(user_query, classification)
+        else:
+            logger.debug("분류 캐시 적중")
+            # 정규화 키가 같으므로 대소문자/공백/문장 끝 부호만 다른 같은 질문, 표기는 현재 요청 기준으로 교체
+            if classification.get("query"):
+                classification = {**classification, "query": user_query}
         action_type = classification.get("action_type", "GENERAL_CHAT")
-        print(f"🔍 질문 분류 결과: {action_type}")
+        logger.debug("질문 분류 결과: %s", action_type)
         
         # 2. action_type에 따른 처리
         if action_type == "GENERAL_CHAT":
@@ -351,9 +618,10 @@ async def classify_query(request: ClassifyQueryRequest):
             chat_answer = classification.get("chat_answer")
             if not chat_answer:
                 # chat_answer가 없으면 생성
-                chat_answer = llm_service.chat(user_query)
+                chat_answer = await asyncio.to_thread(llm_service.chat, user_query)
             
-            return QueryClassificationResponse(
+            # trusted: LLM+internal
+            return QueryClassificationResponse.model_construct(
                 action_type=action_type,
                 chat_answer=chat_answer,
                 query=None
@@ -361,26 +629,41 @@ async def classify_query(request: ClassifyQueryRequest):
         
         elif action_type == "SQL":
             query_text = classification.get("query", user_query)
-            print("📝 SQL 질문 처리 중...")
-            generated_sql = rag_service.generate_sql(query_text)
+            logger.debug("SQL 질문 처리 중")
+            generated_sql = classification.get("sql")
+            sql_call = None
+            if not generated_sql:
+                sql_call = asyncio.create_task(asyncio.to_thread(
+                    rag_service.generate_sql,
+                    query_text, _embedding_for(query_text, user_query, query_embedding)
+                ))
             data = request.data
             
             if data:
-                print(f"📊 SQL 결과 데이터 제공됨 (길이: {len(data)}). 요약 생성 중...")
-                summary = llm_service.summarize(query_text, data)
-                print("✅ SQL 결과 요약 생성 완료")
-                return QueryClassificationResponse(
+                logger.debug("SQL 결과 데이터 제공됨 (길이: %d). 요약 생성 중", len(data))
+                # 요약은 SQL과 무관하므로 SQL 생성과 동시에 실행
+                summary_call = asyncio.to_thread(llm_service.summarize, query_text, data)
+                if sql_call is not None:
+                    generated_sql, summary = await asyncio.gather(sql_call, summary_call)
+                else:
+                    summary = await summary_call
+                logger.debug("SQL 결과 요약 생성 완료")
+                # trusted: LLM+internal
+                return QueryClassificationResponse.model_construct(
                     action_type=action_type,
                     chat_answer=summary,
                     query=query_text,
                     sql=generated_sql
                 )
             else:
+                if sql_call is not None:
+                    generated_sql = await sql_call
                 guidance = (
                     "SQL을 생성했습니다. 먼저 아래 SQL을 실행하여 얻은 결과를 JSON 형태로 "
                     "'data' 필드에 담아 다시 요청해주시면 요약을 제공할 수 있습니다."
                 )
-                return QueryClassificationResponse(
+                # trusted: LLM+internal
+                return QueryClassificationResponse.model_construct(
                     action_type=action_type,
                     chat_answer=guidance,
                     query=query_text,
@@ -391,33 +674,50 @@ async def classify_query(request: ClassifyQueryRequest):
             # REPORT 질문: 먼저 SQL을 제공하고, 데이터가 있으면 HTML 보고서 생성
             query_text = classification.get("query", user_query)
             
-            print(f"📊 보고서 생성을 위한 SQL 생성 중...")
-            sql = rag_service.generate_sql(query_text)
-            print(f"📝 생성된 SQL: {sql}")
+            logger.debug("보고서 생성을 위한 SQL 생성 중")
+            # SQL 생성은 바로 시작 (data가 있으면 보고서 생성과 겹쳐서 실행)
+            sql_call = asyncio.create_task(asyncio.to_thread(
+                rag_service.generate_sql,
+                query_text, _embedding_for(query_text, user_query, query_embedding)
+            ))
             
             data = request.data
-            print(f"🔍 데이터 확인: data 제공 여부={data is not None}")
+            logger.debug("데이터 확인: data 제공 여부=%s", data is not None)
+            if data and _wants_event_stream(http_request):
+                # SSE: SQL을 먼저 보내고 HTML 보고서는 생성되는 대로 전송
+                return StreamingResponse(
+                    _report_events(query_text, data, sql_call),
+                    media_type="text/event-stream"
+                )
             if data:
-                print(f"📊 데이터 기반 보고서 생성 중... (데이터 크기: {len(data)} 문자)")
-                report_text, html_report = llm_service.generate_report(query_text, data)
-                print(f"✅ 보고서 생성 완료: 보고서 길이={len(report_text)} 문자")
-                print(f"🔍 보고서 미리보기: {report_text[:200]}...")
+                logger.debug("데이터 기반 보고서 생성 중 (데이터 크기: %d 문자)", len(data))
+                # 보고서는 이미 받은 데이터만 사용하므로 SQL 생성과 동시에 실행
+                report_call = asyncio.create_task(
+                    asyncio.to_thread(llm_service.generate_report, query_text, data)
+                )
+                sql, (report_text, html_report) = await asyncio.gather(sql_call, report_call)
+                logger.debug("생성된 SQL: %s", sql)
+                logger.debug("보고서 생성 완료: 보고서 길이=%d 문자", len(report_text))
                 
-                response = QueryClassificationResponse(
+                # trusted: LLM+internal
+                response = QueryClassificationResponse.model_construct(
                     action_type=action_type,
                     chat_answer=report_text,
                     query=query_text,
                     sql=sql,
                     report_html=html_report
                 )
-                print(f"🔍 응답 객체 생성 완료: HTML 길이={len(html_report) if html_report else 0}")
+                logger.debug("응답 객체 생성 완료: HTML 길이=%d", len(html_report) if html_report else 0)
                 return response
             else:
+                sql = await sql_call
+                logger.debug("생성된 SQL: %s", sql)
                 guidance = (
                     "보고서를 생성하려면 아래 SQL을 먼저 실행하여 결과를 JSON으로 만든 뒤 "
                     "'data' 필드에 담아 다시 요청해주세요."
                 )
-                return QueryClassificationResponse(
+                # trusted: LLM+internal
+                return QueryClassificationResponse.model_construct(
                     action_type=action_type,
                     chat_answer=guidance,
                     query=query_text,
@@ -429,14 +729,16 @@ async def classify_query(request: ClassifyQueryRequest):
             raise ValueError(f"알 수 없는 action_type: {action_type}")
             
     except Exception as e:
-        import traceback
-        error_detail = f"질문 분류 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ 에러 상세: {error_detail}")
+        logger.exception("질문 분류 중 오류 발생")
         raise HTTPException(status_code=500, detail=f"질문 분류 중 오류 발생: {str(e)}")
 
 
-@app.post("/generate-report", response_model=GenerateReportResponse)
-async def generate_report(request: GenerateReportRequest):
+@app.post(
+    "/generate-report",
+    response_model=GenerateReportResponse,
+    openapi_extra=_openapi_body(GenerateReportRequest)
+)
+async def generate_report(http_request: Request):
     """
     보고서 생성 API
     
@@ -447,6 +749,7 @@ async def generate_report(request: GenerateReportRequest):
     - 트렌드, 패턴, 비교 분석 포함
     - 자연스러운 한국어 보고서 생성
     - Gemini에게 Google Slides URL 요청 (실제 파일이 아닐 수 있음)
+    - Accept: text/event-stream 요청 시 HTML 보고서를 생성되는 대로 SSE로 전송 (html → done 이벤트)
     
     Returns:
         GenerateReportResponse:
@@ -456,27 +759,39 @@ async def generate_report(request: GenerateReportRequest):
     if llm_service is None:
         raise HTTPException(status_code=500, detail="LLM 서비스가 초기화되지 않았습니다.")
     
+    request = _decode_body(http_request.state.raw_body, GenerateReportPayload, GenerateReportRequest)
+    
+    if _wants_event_stream(http_request):
+        # SSE: HTML 보고서를 생성되는 대로 전송 (요약 없이 HTML만)
+        return StreamingResponse(
+            _report_events(request.query, request.data),
+            media_type="text/event-stream"
+        )
+    
     try:
-        print(f"📊 보고서 생성 중...")
-        print(f"📝 질문: {request.query}")
-        print(f"📊 데이터 크기: {len(request.data)} 문자")
+        logger.debug("보고서 생성 중: 질문=%s, 데이터 크기=%d 문자", request.query, len(request.data))
         
-        report, html_report = llm_service.generate_report(request.query, request.data)
-        print(f"✅ 보고서 생성 완료: 길이={len(report)} 문자")
+        report, html_report = await asyncio.to_thread(llm_service.generate_report, request.query, request.data)
+        logger.debug("보고서 생성 완료: 길이=%d 문자", len(report))
         
-        return GenerateReportResponse(report=report, report_html=html_report)
+        # trusted: LLM+internal
+        return GenerateReportResponse.model_construct(report=report, report_html=html_report)
     except Exception as e:
-        import traceback
-        error_detail = f"보고서 생성 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ 에러 상세: {error_detail}")
+        logger.exception("보고서 생성 중 오류 발생")
         raise HTTPException(status_code=500, detail=f"보고서 생성 중 오류 발생: {str(e)}")
 
 
 if __name__ == "__main__":
+    # DEBUG 모드: 코드 변경 시 자동 재시작 (단일 프로세스)
+    # 운영 모드: uvloop + httptools, 워커 여러 개 (uvloop은 Windows 미지원)
     uvicorn.run(
         "main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
-        reload=True
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=None if settings.DEBUG else (settings.API_WORKERS or os.cpu_count() or 1),
+        reload=settings.DEBUG,
+        log_level=settings.LOG_LEVEL.lower()
     )
 
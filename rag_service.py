@@ -2,23 +2,286 @@
 RAG 서비스 모듈
 임베딩 생성, Vector DB 검색, SQL 생성 파이프라인을 처리합니다.
 """
+import asyncio
+import io
+import logging
+import threading
+from collections import OrderedDict
 import chromadb
+import numpy as np
 from chromadb.config import Settings as ChromaSettings
-from typing import List
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from config import settings
-from llm_service import LLMService
+from llm_service import LLMService, gemini_retry, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# ChromaDB HTTP 연결 풀 크기 (동시 요청 시 TCP 연결 재사용)
+CHROMA_POOL_CONNECTIONS = 32
+CHROMA_POOL_MAXSIZE = 64
+
+# 문서 수가 이 값 미만이면 시작 시 전체 임베딩을 메모리에 올려 로컬에서 검색
+LOCAL_SEARCH_MAX_DOCS = 10000
+
+
+class SemanticCache:
+    """
+    질문 결과 캐시 (정확 일치 + 의미 유사도 2단계)
+    
+    - 1단계: 정규화된 질문 문자열로 정확히 일치하는 항목 조회 (임베딩 불필요)
+    - 2단계: 질문 임베딩과 저장된 임베딩의 코사인 유사도가 threshold 이상인 항목 재사용
+    
+    "8월 발주 건수"와 "9월 발주 건수"처럼 값만 다른 질문도 유사도가 threshold를 넘을 수 있으므로,
+    2단계는 스키마 힌트처럼 질문이 조금 달라도 그대로 쓸 수 있는 검색 결과에만 사용합니다.
+    SQL/답변 캐시는 임베딩 없이 get/put 하여 정확 일치로만 재사용합니다.
+    
+    항목 수가 maxsize를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다(LRU).
+    반환된 payload는 여러 요청이 공유하므로 수정하지 않아야 합니다.
+    """
+    
+    def __init__(self, maxsize: Optional[int] = None, threshold: Optional[float] = None):
+        self.maxsize = maxsize if maxsize is not None else settings.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 정규화된 질문 -> (payload, 임베딩 행 번호 또는 None), 순서가 곧 LRU 순서
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # 임베딩 행렬 E[maxsize, d] (L2 정규화, 첫 임베딩 저장 시 할당)
+        self._embs: Optional[np.ndarray] = None
+        self._row_keys: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+    
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        """임베딩을 float32 단위 벡터로 변환 (내적 = 코사인 유사도)"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+    
+    def get(self, query: str, embedding: Optional[List[float]] = None) -> Optional[Any]:
+        """
+        캐시 조회
+        
+        Args:
+            query: 사용자 질문
+            embedding: 질문 임베딩 (None이면 정확 일치만 확인)
+            
+        Returns:
+            저장된 payload, 없으면 None
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and embedding is not None and self._embs is not None:
+                scores = self._embs @ self._unit(embedding)
+                row = int(np.argmax(scores))
+                row_key = self._row_keys[row]
+                if row_key is not None and scores[row] >= self.threshold:
+                    key, entry = row_key, self._entries[row_key]
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, query: str, payload: Any, embedding: Optional[List[float]] = None) -> None:
+        """
+        캐시 저장
+        
+        Args:
+            query: 사용자 질문
+            payload: 저장할 결과
+            embedding: 질문 임베딩 (None이면 정확 일치로만 조회 가능)
+        """
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._entries:
+                row = self._entries.pop(key)[1]
+            else:
+                if len(self._entries) >= self.maxsize:
+                    _, (_, old_row) = self._entries.popitem(last=False)
+                    self._release_row(old_row)
+                row = None
+            if row is None and embedding is not None:
+                row = self._claim_row(key, self._unit(embedding))
+            self._entries[key] = (payload, row)
+    
+    def stats(self) -> Dict[str, Any]:
+        """적중/실패 횟수, 항목 수, 적중률"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0
+            }
+    
+    def clear(self) -> None:
+        """캐시 전체와 통계 비우기"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self._entries.clear()
+            self._embs = None
+            self._row_keys = []
+            self._free_rows = []
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _claim_row(self, key: str, vec: np.ndarray) -> int:
+        """임베딩 행렬의 빈 행에 벡터 기록 (lock 안에서 호출)"""
+        if self._embs is None:
+            self._embs = np.zeros((self.maxsize, vec.shape[0]), dtype=np.float32)
+            self._row_keys = [None] * self.maxsize
+            self._free_rows = list(range(self.maxsize - 1, -1, -1))
+        row = self._free_rows.pop()
+        self._embs[row] = vec
+        self._row_keys[row] = key
+        return row
+    
+    def _release_row(self, row: Optional[int]) -> None:
+        """제거된 항목의 임베딩 행 반환 (lock 안에서 호출)"""
+        if row is None:
+            return
+        self._embs[row] = 0.0
+        self._row_keys[row] = None
+        self._free_rows.append(row)
+
+
+class BatchedEmbedder:
+    """
+    동시에 들어온 질문 임베딩 요청을 모아 한 번의 배치 임베딩 호출로 처리
+    
+    첫 요청 후 max_wait_ms 동안(또는 max_batch개가 찰 때까지) 요청을 모아 일괄 전송하고,
+    결과를 각 요청의 Future로 돌려줍니다. start()는 이벤트 루프 안에서 호출해야 합니다.
+    """
+    
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[int] = None
+    ):
+        self._embed_batch = embed_batch
+        self.max_batch = max_batch or settings.EMBED_BATCH_MAX
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBED_BATCH_WAIT_MS) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+    
+    def start(self) -> None:
+        """백그라운드 배치 작업 시작"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """백그라운드 배치 작업 종료 (진행 중인 요청은 마무리)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+    
+    async def embed(self, text: str) -> List[float]:
+        """
+        텍스트 하나를 임베딩 (다른 동시 요청과 묶여 전송됨)
+        
+        Args:
+            text: 임베딩할 텍스트
+            
+        Returns:
+            임베딩 벡터
+        """
+        if self._task is None:
+            # 배치 작업이 시작되지 않았으면 단건 요청
+            return (await asyncio.to_thread(self._embed_batch, [text]))[0]
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _run(self) -> None:
+        """요청을 모아 배치 단위로 전송 (전송은 별도 태스크로 실행해 다음 배치 수집을 막지 않음)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._flush(items))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _flush(self, items: List[Tuple[str, asyncio.Future]]) -> None:
+        """모은 요청을 배치 임베딩 한 번으로 처리하고 결과 전달 (중복 텍스트는 한 번만 전송)"""
+        texts = list(dict.fromkeys(text for text, _ in items))
+        try:
+            vectors = await asyncio.to_thread(self._embed_batch, texts)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, future in items:
+            if not future.done():
+                future.set_result(by_text[text])
 
 
 class RAGService:
     """RAG 서비스 클래스"""
     
-    def __init__(self):
-        """RAG 서비스 초기화"""
-        # ChromaDB 클라이언트 연결
+    def __init__(self, llm_service: LLMService):
+        """
+        RAG 서비스 초기화
+        
+        Args:
+            llm_service: 공유할 LLM 서비스 (클라이언트/캐시를 엔드포인트와 함께 사용)
+        """
+        self.llm_service = llm_service
+        
+        # 임베딩 모델 초기화
+        self._init_embedding_model()
+        
+        # 질문 -> SQL 캐시 (정규화된 질문이 정확히 같을 때만 재사용)
+        self.sql_cache = SemanticCache()
+        # 질문 -> 스키마 힌트 캐시 (유사한 질문은 임베딩 이후 스키마 검색 생략)
+        self.hints_cache = SemanticCache()
+        
+        # Vector DB 초기화 (chroma 또는 pgvector)
+        self.chroma_client = None
+        self.collection = None
+        self.pg_store = None
+        self._docs: List[str] = []
+        self._embs: Optional[np.ndarray] = None
+        if settings.VECTOR_STORE.lower() == "pgvector":
+            self._init_pgvector()
+        else:
+            self._init_chroma()
+    
+    def _init_chroma(self):
+        """ChromaDB 클라이언트 연결 및 컬렉션 준비"""
         self.chroma_client = chromadb.HttpClient(
             host=settings.CHROMA_HOST,
             port=settings.CHROMA_PORT
         )
+        self._mount_connection_pool()
         
         # 컬렉션 가져오기 또는 생성
         try:
@@ -31,26 +294,113 @@ class RAGService:
                 name=settings.CHROMA_COLLECTION_NAME
             )
         
-        # LLM 서비스 초기화
-        self.llm_service = LLMService()
+        self._load_snapshot()
+    
+    def _mount_connection_pool(self):
+        """ChromaDB 클라이언트 내부 requests.Session에 keep-alive 연결 풀 설정"""
+        import requests
+        from requests.adapters import HTTPAdapter
         
-        # 임베딩 모델 초기화
-        self._init_embedding_model()
+        # chromadb 0.4.x: Client._server(FastAPI)._session 이 requests.Session
+        server = getattr(self.chroma_client, "_server", None)
+        session = getattr(server, "_session", None)
+        if not isinstance(session, requests.Session):
+            logger.warning("ChromaDB 세션을 찾을 수 없어 기본 연결 설정을 사용합니다.")
+            return
+        adapter = HTTPAdapter(
+            pool_connections=CHROMA_POOL_CONNECTIONS,
+            pool_maxsize=CHROMA_POOL_MAXSIZE
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    
+    def _load_snapshot(self):
+        """작은 컬렉션은 전체 문서/임베딩을 한 번만 가져와 메모리에 보관 (행 단위 L2 정규화)"""
+        self._docs = []
+        self._embs = None
+        try:
+            count = self.collection.count()
+            if count == 0 or count >= LOCAL_SEARCH_MAX_DOCS:
+                return
+            raw = self.collection.get(include=["documents", "embeddings"])
+            embs = np.ascontiguousarray(np.asarray(raw["embeddings"], dtype=np.float32))
+            norms = np.linalg.norm(embs, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embs /= norms
+            self._docs = raw["documents"]
+            self._embs = embs
+            logger.info("스키마 스냅샷 로드 완료: %d개 문서 (로컬 검색 사용)", len(self._docs))
+        except Exception:
+            logger.warning("스키마 스냅샷 로드 실패, ChromaDB 검색을 사용합니다.", exc_info=True)
+    
+    def invalidate(self):
+        """
+        스키마 재적재(ingest_schema.py) 후 메모리 스냅샷 다시 로드하고 SQL/스키마 힌트 캐시 비우기
+        
+        이 프로세스의 상태만 갱신합니다. 워커가 여러 개면 다른 워커는 재시작 전까지 이전 스냅샷을 사용합니다.
+        """
+        if self.collection is not None:
+            self._load_snapshot()
+        self.sql_cache.clear()
+        self.hints_cache.clear()
+    
+    def _top_indices(self, query_embedding: List[float], top_k: int) -> np.ndarray:
+        """
+        메모리 스냅샷에서 코사인 유사도 기준 상위 top_k 문서의 인덱스 (유사도 내림차순)
+        
+        전체 점수는 float32 행렬-벡터 곱 한 번으로 계산하고, argpartition으로 상위 top_k만 정렬합니다.
+        """
+        q = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        if norm > 0:
+            q = q / norm
+        
+        scores = self._embs @ q
+        k = min(top_k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top])]
+    
+    def _search_snapshot(self, query_embedding: List[float], top_k: int) -> List[str]:
+        """메모리 스냅샷에서 코사인 유사도 기준 상위 top_k 문서 검색"""
+        return [self._docs[i] for i in self._top_indices(query_embedding, top_k)]
+    
+    def _init_pgvector(self):
+        """pgvector 저장소 연결 (HNSW 인덱스는 ingest_schema.py에서 생성)"""
+        if not settings.POSTGRES_URL:
+            raise ValueError("VECTOR_STORE=pgvector 사용 시 POSTGRES_URL이 필요합니다.")
+        
+        from langchain_postgres import PGVector
+        self.pg_store = PGVector(
+            embeddings=self.embeddings,
+            collection_name=settings.CHROMA_COLLECTION_NAME,
+            connection=settings.POSTGRES_URL,
+            embedding_length=settings.PGVECTOR_EMBEDDING_DIM,
+            use_jsonb=True
+        )
     
     def _init_embedding_model(self):
         """임베딩 모델 초기화 (Gemini 사용)"""
         if not settings.GOOGLE_API_KEY:
             raise ValueError("임베딩 모델을 사용하기 위해 GOOGLE_API_KEY가 필요합니다.")
         
-        from langchain_google_genai import GoogleGenerativeAIEmbeddings
         self.embeddings = GoogleGenerativeAIEmbeddings(
             model="models/text-embedding-004",
             google_api_key=settings.GOOGLE_API_KEY
         )
+        
+        # 첫 요청 전에 연결/인증을 미리 맺어 둠 (실패해도 서비스는 계속 기동)
+        try:
+            self.embeddings.embed_query("warmup")
+        except Exception:
+            logger.warning("임베딩 모델 워밍업 실패", exc_info=True)
     
+    @gemini_retry
     def generate_embedding(self, text: str) -> List[float]:
         """
-        텍스트를 임베딩 벡터로 변환
+        텍스트를 임베딩 벡터로 변환 (임베딩 SDK는 재시도하지 않으므로 429 시 백오프 후 재시도)
         
         Args:
             text: 임베딩할 텍스트
@@ -60,13 +410,37 @@ class RAGService:
         """
         return self.embeddings.embed_query(text)
     
-    def search_similar_schemas(self, query: str, top_k: int = None) -> List[str]:
+    @gemini_retry
+    def generate_query_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        여러 질문을 한 번의 요청으로 임베딩 벡터로 변환 (429 시 백오프 후 재시도)
+        
+        embed_documents의 기본 task_type은 RETRIEVAL_DOCUMENT(적재용)이므로,
+        embed_query와 같은 벡터가 나오도록 RETRIEVAL_QUERY를 명시합니다.
+        
+        Args:
+            texts: 임베딩할 질문 리스트
+            
+        Returns:
+            입력 순서와 같은 임베딩 벡터 리스트
+        """
+        if not texts:
+            return []
+        return self.embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    
+    def search_similar_schemas(
+        self,
+        query: str,
+        top_k: int = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[str]:
         """
         Vector DB에서 유사한 스키마 힌트 검색
         
         Args:
             query: 사용자 질문
             top_k: 가져올 결과 개수
+            query_embedding: 이미 계산된 질문 임베딩 (없으면 새로 생성)
             
         Returns:
             유사한 스키마 힌트 리스트
@@ -75,16 +449,29 @@ class RAGService:
             top_k = settings.TOP_K_RESULTS
         
         # 쿼리 임베딩 생성
-        query_embedding = self.generate_embedding(query)
+        if query_embedding is None:
+            query_embedding = self.generate_embedding(query)
+        
+        if self.pg_store is not None:
+            # pgvector: HNSW 인덱스(코사인 거리)로 검색
+            docs = self.pg_store.similarity_search_by_vector(query_embedding, k=top_k)
+            logger.debug("pgvector 검색 결과: %d개 문서 발견", len(docs))
+            return [doc.page_content for doc in docs]
         
-        # Vector DB에서 유사 문서 검색 (더 많은 결과 가져오기)
+        if self._embs is not None:
+            # 작은 코퍼스: ChromaDB 왕복 없이 메모리에서 검색
+            found_docs = self._search_snapshot(query_embedding, top_k)
+            logger.debug("로컬 스냅샷 검색 결과: %d개 문서 발견", len(found_docs))
+            return found_docs
+        
+        # Vector DB에서 유사 문서 검색
         try:
             # 컬렉션의 전체 문서 수 확인
             collection_count = self.collection.count()
-            print(f"📊 Vector DB 컬렉션 총 문서 수: {collection_count}")
+            logger.debug("Vector DB 컬렉션 총 문서 수: %d", collection_count)
             
-            # 검색할 개수를 컬렉션 크기에 맞게 조정
-            search_k = min(top_k * 2, max(collection_count, top_k))
+            # 필요한 개수만 요청 (컬렉션보다 많이 요청하지 않음)
+            search_k = min(top_k, collection_count) if collection_count else top_k
             
             results = self.collection.query(
                 query_embeddings=[query_embedding],
@@ -93,64 +480,81 @@ class RAGService:
             
             # 검색 결과에서 문서 텍스트 추출
             documents = results.get('documents', [])
-            print(f"🔍 Vector DB 검색 결과: {len(documents)}개 문서 발견")
+            logger.debug("Vector DB 검색 결과: %d개 문서 발견", len(documents))
             
             if documents and len(documents) > 0:
                 found_docs = documents[0]  # 첫 번째 쿼리의 결과 리스트
-                print(f"📄 검색된 스키마 힌트 개수: {len(found_docs)}")
+                logger.debug("검색된 스키마 힌트 개수: %d", len(found_docs))
                 if len(found_docs) > 0:
-                    print(f"📝 첫 번째 힌트 미리보기: {found_docs[0][:300]}...")
-                    # 모든 검색 결과를 반환 (더 많은 컨텍스트 제공)
                     return found_docs
-            else:
-                # 검색 결과가 없으면 전체 컬렉션에서 가져오기
-                print("⚠️  검색 결과가 없어 전체 스키마를 가져옵니다.")
-                all_results = self.collection.get()
-                if all_results and 'documents' in all_results:
-                    all_docs = all_results['documents']
-                    print(f"📚 전체 스키마 문서 수: {len(all_docs)}")
-                    return all_docs[:top_k] if all_docs else []
-        except Exception as e:
-            print(f"❌ Vector DB 검색 오류: {e}")
-            # 오류 발생 시 전체 컬렉션에서 가져오기
-            try:
-                all_results = self.collection.get()
-                if all_results and 'documents' in all_results:
-                    all_docs = all_results['documents']
-                    print(f"📚 전체 스키마 문서 수: {len(all_docs)}")
-                    return all_docs[:top_k] if all_docs else []
-            except Exception as e2:
-                print(f"❌ 전체 스키마 가져오기 오류: {e2}")
-        
-        print("⚠️  검색 결과가 없습니다.")
+        except Exception:
+            logger.exception("Vector DB 검색 오류")
+        
+        # 전체 컬렉션을 다시 받아오지 않고 힌트 없이 진행 (작은 컬렉션은 위의 스냅샷 검색으로 처리됨)
+        logger.warning("스키마 검색 결과가 없습니다: %s", query)
         return []
     
-    def generate_sql(self, query: str) -> str:
+    def build_schema_hints(self, query: str, query_embedding: Optional[List[float]] = None) -> str:
+        """
+        Vector DB에서 유사한 스키마 힌트를 검색하여 LLM 프롬프트용 문자열로 조합
+        
+        Args:
+            query: 사용자 질문
+            query_embedding: 이미 계산된 질문 임베딩 (없으면 새로 생성)
+            
+        Returns:
+            스키마 힌트 문자열
+        """
+        if query_embedding is None:
+            query_embedding = self.generate_embedding(query)
+        schema_hints = self.hints_cache.get(query, query_embedding)
+        if schema_hints is not None:
+            logger.debug("스키마 힌트 캐시 적중")
+            return schema_hints
+        
+        if self.pg_store is None and self._embs is not None:
+            # 스냅샷 검색: 상위 문서를 리스트로 모으지 않고 바로 문자열로 기록
+            docs = self._docs
+            buf = io.StringIO()
+            for n, i in enumerate(self._top_indices(query_embedding, settings.TOP_K_RESULTS)):
+                if n:
+                    buf.write("\n\n")
+                buf.write(docs[i])
+            schema_hints = buf.getvalue() or "스키마 정보를 찾을 수 없습니다."
+        else:
+            similar_schemas = self.search_similar_schemas(query, query_embedding=query_embedding)
+            schema_hints = "\n\n".join(similar_schemas) if similar_schemas else "스키마 정보를 찾을 수 없습니다."
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("전달된 스키마 힌트 (%d 문자): %s", len(schema_hints), schema_hints)
+        self.hints_cache.put(query, schema_hints, query_embedding)
+        return schema_hints
+    
+    def generate_sql(self, query: str, query_embedding: Optional[List[float]] = None) -> str:
         """
         RAG 파이프라인을 통해 SQL 생성
         
         Args:
             query: 사용자 질문
+            query_embedding: 이미 계산된 질문 임베딩 (없으면 캐시 확인 후 생성)
             
         Returns:
             생성된 SQL 쿼리
         """
-        print(f"📥 사용자 질문: {query}")
+        logger.debug("사용자 질문: %s", query)
         
-        # 1. Vector DB에서 유사한 스키마 힌트 검색
-        similar_schemas = self.search_similar_schemas(query)
+        # 0. 캐시 확인 (정확 일치만, 유사 질문은 조건 값이 다를 수 있음)
+        sql = self.sql_cache.get(query)
+        if sql is not None:
+            logger.debug("SQL 캐시 적중")
+            return sql
         
-        # 2. 스키마 힌트 조합
-        schema_hints = "\n\n".join(similar_schemas) if similar_schemas else "스키마 정보를 찾을 수 없습니다."
-        print(f"📋 전달된 스키마 힌트 길이: {len(schema_hints)} 문자")
-        if len(schema_hints) > 500:
-            print(f"📋 스키마 힌트 미리보기: {schema_hints[:500]}...")
-        else:
-            print(f"📋 스키마 힌트: {schema_hints}")
+        # 1~2. Vector DB에서 유사한 스키마 힌트 검색 및 조합 (유사 질문은 힌트 캐시 재사용)
+        schema_hints = self.build_schema_hints(query, query_embedding)
         
         # 3. LLM에 SQL 생성 요청
         sql = self.llm_service.generate_sql(query, schema_hints)
-        print(f"✅ 생성된 SQL: {sql}")
+        logger.debug("생성된 SQL: %s", sql)
         
+        self.sql_cache.put(query, sql)
         return sql
 
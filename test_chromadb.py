@@ -37,7 +37,10 @@ def test_chromadb_connection():
         print(f"\n3. 타겟 컬렉션 확인: '{collection_name}'")
         
         try:
-            collection = client.get_collection(name=collection_name)
+            # 위에서 받은 목록을 재사용 (get_collection 추가 요청 없음)
+            collection = next((c for c in collections if c.name == collection_name), None)
+            if collection is None:
+                raise ValueError(f"'{collection_name}' 컬렉션이 없습니다.")
             count = collection.count()
             print(f"   ✅ 컬렉션 존재함")
             print(f"   📊 총 문서 수: {count}")
@@ -45,11 +48,12 @@ def test_chromadb_connection():
             # 샘플 데이터 확인
             if count > 0:
                 print(f"\n4. 샘플 데이터 확인...")
-                sample = collection.get(limit=3)
-                if sample and 'documents' in sample:
+                # 출력하는 문서만 요청 (임베딩/메타데이터 제외)
+                sample = collection.get(limit=3, include=['documents'])
+                if sample and sample.get('documents'):
                     print(f"   📄 샘플 문서 {len(sample['documents'])}개:")
-                    for i, doc in enumerate(sample['documents'][:3], 1):
-                        preview = doc[:200] + "..." if len(doc) > 200 else doc
+                    for i, doc in enumerate(sample['documents'], 1):
+                        preview = doc if len(doc) <= 200 else doc[:200] + "..."
                         print(f"   {i}. {preview}")
                 else:
                     print("   ⚠️  문서 데이터가 없습니다.")